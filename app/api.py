@@ -0,0 +1,163 @@
+# 전기차 정비 Q&A HTTP API (FastAPI)
+# 1.	🌐 POST /ask: 질문 하나에 대한 답변, 라우팅 결과, 참고 청크, 이미지 경로를 JSON으로 반환합니다.
+# 2.	📡 POST /ask/stream: route → sources → token... → done 이벤트를 NDJSON(한 줄에 JSON 하나)으로 스트리밍합니다.
+# 3.	⚡ LLM/임베딩 호출은 비동기 클라이언트(공유 커넥션 풀)로 처리하므로 요청마다 스레드를 쓰지 않습니다.
+# 4.	📄 GET /documents/{source}: 참고 PDF를 파일에서 바로 스트리밍합니다 (Range 지원, 주소 끝의 #page=N 으로 인용 페이지 열기).
+#       	?page=N&page_end=M 을 주면 그 페이지만 잘라낸 PDF를 돌려줍니다.
+#
+# 실행: uvicorn app.api:app --host 0.0.0.0 --port 8000
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from pydantic import BaseModel
+
+from rag import run_qa_chain
+from rag.documents import document_url, page_excerpt, resolve_pdf
+from rag.metrics import collector
+from rag.router import ROUTING_MODES
+
+# 동시에 처리할 질문 수 (넘는 요청은 대기)
+API_MAX_CONCURRENCY = int(os.getenv("RAG_API_MAX_CONCURRENCY", "32"))
+
+
+class AskRequest(BaseModel):
+    question: str
+    routing_mode: Optional[str] = None
+    use_cache: bool = True
+
+
+class Source(BaseModel):
+    source: str
+    document: str
+    section: str
+    page: Optional[int] = None
+    page_end: Optional[int] = None
+    url: Optional[str] = None
+    content: str
+
+
+class AskResponse(BaseModel):
+    answer: str
+    section: str
+    document: str
+    routing: str
+    cache: Optional[str] = None
+    sources: List[Source]
+    image_paths: List[str]
+    metrics: Dict = {}
+
+
+# ✅ 응답 직렬화 (langchain Document → dict)
+def serialize_sources(docs) -> List[Dict]:
+    return [{
+        "source": doc.metadata.get("source", ""),
+        "document": doc.metadata.get("document", ""),
+        "section": doc.metadata.get("section", ""),
+        "page": doc.metadata.get("page"),
+        "page_end": doc.metadata.get("page_end"),
+        "url": document_url(doc.metadata.get("source", ""), doc.metadata.get("page")),
+        "content": doc.page_content
+    } for doc in docs]
+
+
+def serialize_result(result: Dict) -> Dict:
+    return {
+        "answer": result["result"].removeprefix("[정비사 답변]").strip(),
+        "section": result["section"],
+        "document": result["document"],
+        "routing": result["routing"],
+        "cache": result.get("cache"),
+        "sources": serialize_sources(result["source_documents"]),
+        "image_paths": result["image_paths"],
+        "metrics": result.get("metrics", {})
+    }
+
+
+def serialize_event(event: Dict) -> Dict:
+    if event["type"] == "sources":
+        return {"type": "sources", "sources": serialize_sources(event["source_documents"]),
+                "image_paths": event["image_paths"]}
+    if event["type"] == "done":
+        return {"type": "done", **serialize_result(event["result"])}
+    return event
+
+
+def check_request(request: AskRequest):
+    if not request.question.strip():
+        raise HTTPException(status_code=422, detail="질문이 비어 있습니다.")
+    if request.routing_mode and request.routing_mode not in ROUTING_MODES:
+        raise HTTPException(status_code=422,
+                            detail=f"지원하지 않는 라우팅 모드: {request.routing_mode} (선택지: {ROUTING_MODES})")
+
+
+# ✅ 앱 (시작할 때 모델/벡터 DB를 미리 초기화)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(run_qa_chain.warm_up)
+    app.state.limiter = asyncio.Semaphore(API_MAX_CONCURRENCY)
+    yield
+
+
+app = FastAPI(title="전기차 정비 Q&A API", lifespan=lifespan)
+FastAPIInstrumentor.instrument_app(app)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+# ✅ 프로세스 내 지표 (단계별 p50/p95, 토큰 합계, 캐시 적중 수)
+@app.get("/metrics")
+async def metrics():
+    return collector.snapshot()
+
+
+@app.post("/ask", response_model=AskResponse)
+async def ask(request: AskRequest):
+    check_request(request)
+    async with app.state.limiter:
+        result = await run_qa_chain.arun_custom_qa(
+            request.question, request.routing_mode, request.use_cache
+        )
+    return serialize_result(result)
+
+
+@app.post("/ask/stream")
+async def ask_stream(request: AskRequest):
+    check_request(request)
+
+    async def ndjson():
+        async with app.state.limiter:
+            async for event in run_qa_chain.astream_custom_qa(
+                request.question, request.routing_mode, request.use_cache
+            ):
+                yield json.dumps(serialize_event(event), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+# ✅ 참고 PDF (전체는 파일 스트리밍, page를 주면 인용 페이지만)
+@app.get("/documents/{source:path}")
+async def document(source: str, page: Optional[int] = None, page_end: Optional[int] = None):
+    path = resolve_pdf(source)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"문서를 찾을 수 없습니다: {source}")
+    if page is None:
+        return FileResponse(path, media_type="application/pdf", filename=path.name,
+                            content_disposition_type="inline")
+    excerpt = await asyncio.to_thread(page_excerpt, path, page, page_end)
+    filename = quote(f"{path.stem}_p{page}.pdf")
+    return Response(excerpt, media_type="application/pdf",
+                    headers={"Content-Disposition": f"inline; filename*=utf-8''{filename}"})
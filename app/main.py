@@ -1,16 +1,35 @@
 import streamlit as st
 from pathlib import Path
-from rag.run_qa_chain import run_custom_qa
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import re
 
+from rag.documents import document_url, page_excerpt, resolve_pdf
+from rag.image_store import make_thumbnail
+
+# 관련 이미지는 썸네일로 한 페이지에 이 개수만 보여주고, 원본은 눌렀을 때만 불러옴
+IMAGE_PAGE_SIZE = int(os.getenv("RAG_IMAGE_PAGE_SIZE", "6"))
+# app/api.py 주소 (설정하면 참고 문서마다 인용 페이지로 바로 여는 전체 PDF 링크 표시)
+API_URL = os.getenv("RAG_API_URL", "")
+
 # ✅ 설정
 st.set_page_config(page_title="전기차 정비 Q&A 어시스턴트", layout="wide")
 st.title("🔧 전기차 정비 Q&A 어시스턴트")
 
+# ✅ QA 파이프라인 (임베딩/LLM/Chroma는 프로세스당 한 번만 생성, 리런 시 재사용)
+
+
+@st.cache_resource(show_spinner="🔧 모델과 벡터 DB 불러오는 중...")
+def load_qa_pipeline():
+    from rag import run_qa_chain
+    run_qa_chain.warm_up()
+    return run_qa_chain
+
+
+qa_pipeline = load_qa_pipeline()
+
 # ✅ 헬퍼 함수
 
 
@@ -24,75 +43,112 @@ def clean_image_name(name: str) -> str:
     return re.sub(r"_page\d+_img\d+\.png$", "", name)
 
 
+@st.cache_data(show_spinner=False)
+def get_thumbnail(path: str) -> str:
+    """썸네일 경로 (추출 때 만들어 두지 않은 이미지는 처음 볼 때 생성, 만들 수 없으면 원본)"""
+    return make_thumbnail(path) or path
+
+
+@st.dialog("🔍 원본 이미지", width="large")
+def show_full_image(path: str, caption: str):
+    st.image(path, caption=caption, use_container_width=True)
+
+
+# ✅ 이미지 갤러리 (fragment라서 페이지 이동/원본 보기 때 질문 처리를 다시 하지 않음)
+@st.fragment
+def render_image_gallery(image_paths, image_names, key: str):
+    images = [(path, name.rsplit("_page", 1)[0])  # _page0 제거
+              for path, name in zip(image_paths, image_names) if path and Path(path).exists()]
+    if not images:
+        st.info("관련 이미지가 없습니다.")
+        return
+
+    page_count = (len(images) + IMAGE_PAGE_SIZE - 1) // IMAGE_PAGE_SIZE
+    page = 1
+    if page_count > 1:
+        page = st.number_input(f"페이지 (총 {len(images)}개, {page_count}쪽)", min_value=1,
+                               max_value=page_count, value=1, key=f"image_page_{key}")
+    start = (page - 1) * IMAGE_PAGE_SIZE
+
+    # 이미지 두 개씩 나눠서 두 열로 출력
+    page_images = images[start:start + IMAGE_PAGE_SIZE]
+    for i in range(0, len(page_images), 2):
+        cols = st.columns(2)
+        for j, (path, display_name) in enumerate(page_images[i:i + 2]):
+            cols[j].image(get_thumbnail(path), caption=display_name, use_container_width=True)
+            if cols[j].button("🔍 원본", key=f"full_image_{key}_{start + i + j}"):
+                show_full_image(path, display_name)
+
+
 # ✅ 입력창
 query = st.text_input("질문을 입력하세요:", placeholder="예: 기능통합형 드라이브 액슬 탈거 방법 알려줘")
 
 # ✅ 질문 처리
 if query:
-    with st.spinner("⏳ 답변 생성 중..."):
-        result = run_custom_qa(query)
-
-        # 좌우 2컬럼 레이아웃
-        left_col, right_col = st.columns([2, 1])
-
-        with left_col:
-            st.markdown("### 🔧 정비사 답변")
-
-            # [정비사 답변] 제거
-            cleaned_answer = result["result"].removeprefix("[정비사 답변]").strip()
-            st.success(cleaned_answer)
-
-            st.markdown("### 📄 참고 문서")
-            if not result["source_documents"]:
-                st.warning("📄 관련 문서를 찾지 못했습니다.")
-            else:
-                for i, doc in enumerate(result["source_documents"], 1):
-                    source_rel = doc.metadata.get("source", "")
-                    source_name = Path(source_rel).stem  # 파일명 (확장자 제외)
-                    file_path = Path.cwd() / source_rel  # 앱 실행 기준 상대 경로
-
-                    if file_path.exists():
-                        with open(file_path, "rb") as f:
-                            st.download_button(
-                                label=f"문서 {i}: {source_name}",
-                                data=f.read(),
-                                file_name=Path(source_rel).name,
-                                mime="application/pdf"
-                            )
-                    else:
-                        st.markdown(f"- 문서 {i}: `{source_name}` (⚠️ 파일 없음)")
-
-            st.markdown(f"`{result['section']}`")
-            st.markdown("### 📚 참고된 문서 청크")
-            if not result["source_documents"]:
-                st.info("관련 문서 청크가 없습니다.")
-            else:
-                for i, doc in enumerate(result["source_documents"], 1):
-                    doc_title = doc.metadata.get("document", "제목 없음")
-                    section = doc.metadata.get("section", "섹션 정보 없음")
-                    full_text = doc.page_content.strip()
-
-                    with st.expander(f"{i}. {doc_title} — 섹션: {section}"):
-                        st.markdown(full_text)
-                        
-        with right_col:
-            st.markdown("### 📷 관련 이미지")
-
-            image_paths = result.get("image_paths", [])
-            image_names = result.get("image_names", [])
-
-            # 이미지 두 개씩 나눠서 두 열로 출력
-            for i in range(0, len(image_paths), 2):
-                cols = st.columns(2)
-                for j in range(2):
-                    if i + j < len(image_paths):
-                        path = image_paths[i + j]
-                        name = image_names[i + j]
-                        display_name = name.rsplit("_page", 1)[0]  # _page0_img 제거
-
-                        if path and Path(path).exists():  # ✅ 여기 수정
-                            cols[j].image(
-                                path,
-                                caption=display_name,
-                                use_container_width=True
-                            )
+    events = qa_pipeline.stream_custom_qa(query)
+
+    # 라우팅과 문서 검색까지만 스피너 표시, 답변은 생성되는 대로 출력
+    with st.spinner("⏳ 관련 문서 검색 중..."):
+        route = next(events)
+        sources = next(events)
+
+    # 좌우 2컬럼 레이아웃
+    left_col, right_col = st.columns([2, 1])
+
+    with left_col:
+        st.markdown("### 🔧 정비사 답변")
+        answer_placeholder = st.empty()
+        answer_placeholder.info("⏳ 답변 생성 중...")
+
+        st.markdown("### 📄 참고 문서")
+        if not sources["source_documents"]:
+            st.warning("📄 관련 문서를 찾지 못했습니다.")
+        else:
+            for i, doc in enumerate(sources["source_documents"], 1):
+                source_rel = doc.metadata.get("source", "")
+                source_name = Path(source_rel).stem  # 파일명 (확장자 제외)
+                page = doc.metadata.get("page") or 1
+                page_end = doc.metadata.get("page_end") or page
+                pages_label = f"p.{page}" if page == page_end else f"p.{page}–{page_end}"
+                file_path = resolve_pdf(source_rel)
+
+                if file_path is None:
+                    st.markdown(f"- 문서 {i}: `{source_name}` (⚠️ 파일 없음)")
+                    continue
+                # 매뉴얼 전체 대신 인용 페이지만 잘라서 제공 (전체 문서는 API가 있으면 링크로)
+                st.download_button(
+                    label=f"문서 {i}: {source_name} ({pages_label})",
+                    data=page_excerpt(file_path, page, page_end),
+                    file_name=f"{source_name}_p{page}.pdf",
+                    mime="application/pdf",
+                    key=f"document_{i}"
+                )
+                if API_URL:
+                    st.markdown(f"[전체 문서 열기 ({pages_label})]({document_url(source_rel, page, API_URL)})")
+
+        st.markdown(f"`{route['section']}`")
+        st.markdown("### 📚 참고된 문서 청크")
+        if not sources["source_documents"]:
+            st.info("관련 문서 청크가 없습니다.")
+        else:
+            for i, doc in enumerate(sources["source_documents"], 1):
+                doc_title = doc.metadata.get("document", "제목 없음")
+                section = doc.metadata.get("section", "섹션 정보 없음")
+                full_text = doc.page_content.strip()
+
+                with st.expander(f"{i}. {doc_title} — 섹션: {section}"):
+                    st.markdown(full_text)
+
+    with right_col:
+        st.markdown("### 📷 관련 이미지")
+        render_image_gallery(sources.get("image_paths", []), sources.get("image_names", []), key=query)
+
+    # ✅ 답변 토큰 스트리밍 ([정비사 답변] 머리말은 제거)
+    answer = ""
+    for event in events:
+        if event["type"] == "token":
+            answer += event["text"]
+            answer_placeholder.success(answer.removeprefix("[정비사 답변]").strip() or "⏳")
+        elif event["type"] == "done":
+            cleaned_answer = event["result"]["result"].removeprefix("[정비사 답변]").strip()
+            answer_placeholder.success(cleaned_answer)
@@ -0,0 +1,141 @@
+# 의미 기반 답변 캐시
+# 1.	⚡ run_custom_qa 앞단에서 같은 질문(정규화 후 일치)이나 거의 같은 질문(임베딩 코사인 유사도 ≥ threshold)의
+#       	결과(result / source_documents / image_paths ...)를 그대로 돌려줍니다.
+# 2.	⏳ 항목마다 TTL이 있고, 개수 제한을 넘으면 가장 오래 쓰지 않은 항목부터 지웁니다 (LRU).
+# 3.	🔄 벡터 DB가 다시 만들어지면(인덱스 버전 변경) 캐시 전체를 비웁니다.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from rag.embedding_cache import normalize_text
+
+ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("RAG_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.97"))
+
+
+class AnswerCache:
+    """질문 → QA 결과 캐시 (정확 일치 + 임베딩 유사도, TTL + LRU, 인덱스 버전별 무효화)"""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl_seconds: float = ANSWER_CACHE_TTL,
+                 similarity_threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._version = None
+        self._matrix = None  # (키 목록, 정규화된 질문 벡터 행렬), 항목이 바뀌면 다시 만듦
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry["expires"] <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _semantic_match(self, mode: str, vector: np.ndarray) -> Optional[tuple]:
+        if self._matrix is None:
+            keys = [key for key, entry in self._entries.items() if entry["vector"] is not None]
+            vectors = np.stack([self._entries[key]["vector"] for key in keys]) if keys else None
+            self._matrix = (keys, vectors)
+        keys, vectors = self._matrix
+        if vectors is None:
+            return None
+
+        scores = vectors @ vector
+        for i in np.argsort(scores)[::-1]:
+            if scores[i] < self.similarity_threshold:
+                break
+            if keys[i][0] == mode:
+                return keys[i]
+        return None
+
+    def get(self, query: str, mode: str, version,
+            embed: Optional[Callable[[], List[float]]] = None) -> Optional[Dict]:
+        """정확 일치 → (embed가 있으면) 유사 질문 순서로 찾음. embed는 정확 일치가 없을 때만 호출"""
+        cached, need_vector = self._get_exact(query, mode, version, embed is not None)
+        if not need_vector:
+            return cached
+        return self._get_semantic(mode, embed())
+
+    async def aget(self, query: str, mode: str, version,
+                   embed: Optional[Callable[[], Awaitable[List[float]]]] = None) -> Optional[Dict]:
+        """get()의 비동기 버전 (embed는 코루틴 함수)"""
+        cached, need_vector = self._get_exact(query, mode, version, embed is not None)
+        if not need_vector:
+            return cached
+        return self._get_semantic(mode, await embed())
+
+    def _get_exact(self, query: str, mode: str, version, semantic: bool):
+        key = (mode, normalize_text(query))
+        with self._lock:
+            self._check_version(version)
+            self._purge_expired()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return {**self._entries[key]["payload"], "cache": "exact"}, False
+            if not self._entries or not semantic:
+                self.misses += 1
+                return None, False
+        return None, True
+
+    def _get_semantic(self, mode: str, vector) -> Optional[Dict]:
+        vector = _unit(vector)
+        with self._lock:
+            match = self._semantic_match(mode, vector)
+            if match is None or match not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(match)
+            self.hits += 1
+            return {**self._entries[match]["payload"], "cache": "semantic"}
+
+    def put(self, query: str, mode: str, version, payload: Dict,
+            vector: Optional[List[float]] = None):
+        key = (mode, normalize_text(query))
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = {
+                "payload": payload,
+                "vector": _unit(vector) if vector is not None else None,
+                "expires": time.monotonic() + self.ttl_seconds
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries)
+        }
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
@@ -0,0 +1,214 @@
+# 배치 QA (야간 작업 등 대량 질문 처리)
+# 1.	📥 JSONL 질문 파일({"id": ..., "question": ...})을 batch_size개씩 처리합니다.
+# 2.	🔢 질문 임베딩은 묶음마다 한 번에 계산하고 (embed_documents), 답변 캐시로 반복 질문은 바로 답합니다.
+# 3.	🧭 라우팅/답변 생성 LLM 호출은 세마포어로 동시 실행 수를 제한합니다.
+# 4.	🗂 라우팅된 문서별로 질문을 묶어 "질문 + 문서명" 임베딩과 문서 필터 검색을 그룹당 한 번씩 처리합니다.
+# 5.	📤 결과는 끝나는 대로 JSONL에 한 줄씩 덧붙이고, 다시 실행하면 이미 답한 id는 건너뜁니다.
+#       	(실패한 질문은 "error"와 함께 기록되고 다음 실행 때 다시 시도, 같은 id는 마지막 줄이 최신 결과)
+
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+from rag import run_qa_chain
+from rag.clients import get_embedding_model, get_vectordb
+from rag.context import assemble_context
+from rag.manifest import index_version
+from rag.metrics import QAMetrics
+
+BATCH_SIZE = int(os.getenv("RAG_BATCH_SIZE", "64"))
+BATCH_CONCURRENCY = int(os.getenv("RAG_BATCH_CONCURRENCY", "8"))
+
+
+# ✅ 입력 / 이어하기
+def load_questions(path: Path) -> List[Dict]:
+    """질문 JSONL 로드 (id가 없으면 줄 번호를 id로)"""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            items.append({**item, "id": str(item.get("id", line_number))})
+    return items
+
+
+def repair_tail(path: Path):
+    """중간에 끊겨 줄바꿈 없이 끝난 마지막 줄을 잘라냄 (그 뒤에 이어 쓰면 줄이 섞이므로)"""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data.endswith(b"\n"):
+            return
+        f.truncate(data.rfind(b"\n") + 1)
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """이미 성공한 질문 id (error가 있는 줄은 제외 → 다시 시도)"""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" in record:
+                done.discard(record.get("id"))
+            else:
+                done.add(record.get("id"))
+    return done
+
+
+# ✅ 결과 한 줄
+def make_record(item: Dict, result: Dict) -> Dict:
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "answer": result["result"].removeprefix("[정비사 답변]").strip(),
+        "section": result["section"],
+        "document": result["document"],
+        "routing": result["routing"],
+        "cache": result.get("cache"),
+        "sources": [{
+            "chunk_id": doc.metadata.get("chunk_id"),
+            "source": doc.metadata.get("source", ""),
+            "page": doc.metadata.get("page"),
+            "page_end": doc.metadata.get("page_end")
+        } for doc in result["source_documents"]],
+        "image_paths": result["image_paths"],
+        "metrics": result.get("metrics", {})
+    }
+
+
+def error_record(item: Dict, error: Exception) -> Dict:
+    return {"id": item["id"], "question": item["question"], "error": repr(error)}
+
+
+# ✅ 묶음 하나 처리 (끝나는 순서대로 결과 dict를 내보냄)
+async def aanswer_batch(items: List[Dict], routing_mode: str = None, semaphore: asyncio.Semaphore = None,
+                        use_cache: bool = True) -> AsyncIterator[Dict]:
+    routing_mode = run_qa_chain._check_routing_mode(routing_mode)
+    semaphore = semaphore or asyncio.Semaphore(BATCH_CONCURRENCY)
+    embedding_model = get_embedding_model()
+    answer_cache = run_qa_chain.get_answer_cache()
+    version = index_version(get_vectordb())
+
+    # 1. 질문 임베딩 (묶음 전체를 한 번에, 캐시 조회/local 라우터/캐시 저장에 같이 씀)
+    vectors = await embedding_model.aembed_documents([item["question"] for item in items])
+
+    # 2. 답변 캐시
+    pending = []
+    for item, vector in zip(items, vectors):
+        metrics = QAMetrics(item["question"], routing_mode)
+        if use_cache:
+            with metrics.stage("cache_lookup"):
+                cached = answer_cache.get(item["question"], routing_mode, version, embed=lambda v=vector: v)
+            metrics.cache = cached["cache"] if cached is not None else "miss"
+            if cached is not None:
+                metrics.set_context(cached["source_documents"])
+                yield make_record(item, {**cached, "metrics": metrics.finish()})
+                continue
+        pending.append((item, vector, metrics))
+
+    # 3. 라우팅 (동시 실행 수 제한)
+    async def route(item, vector, metrics):
+        async with semaphore:
+            with metrics.stage("routing", **{"rag.routing_mode": routing_mode}):
+                return await run_qa_chain.aroute_query(item["question"], routing_mode, metrics, vector)
+
+    routes = await asyncio.gather(*(route(*entry) for entry in pending), return_exceptions=True)
+    groups = defaultdict(list)
+    for entry, route_result in zip(pending, routes):
+        if isinstance(route_result, Exception):
+            entry[2].fail(route_result)
+            yield error_record(entry[0], route_result)
+        else:
+            groups[route_result["document"]].append((*entry, route_result))
+
+    # 4. 문서별 검색 ("질문 + 문서명" 임베딩과 검색을 그룹당 한 번씩, 그룹끼리는 동시에)
+    async def retrieve(document, members):
+        started = time.perf_counter()
+        questions = [item["question"] for item, *_ in members]
+        search_vectors = await embedding_model.aembed_documents([f"{q} 관련 문서: {document}" for q in questions])
+        docs_lists = await asyncio.to_thread(run_qa_chain.search_documents_many, questions, document, search_vectors)
+        # 그룹 전체 검색 시간을 질문 수로 나눠 기록
+        elapsed = round((time.perf_counter() - started) * 1000 / len(members), 2)
+        for (_, _, metrics, _), docs in zip(members, docs_lists):
+            metrics.timings["retrieval"] = elapsed
+            metrics.set_context(docs)
+        return docs_lists
+
+    documents = list(groups)
+    retrieved = await asyncio.gather(*(retrieve(document, groups[document]) for document in documents),
+                                     return_exceptions=True)
+
+    # 5. 문맥 조립 + 답변 생성 (동시 실행 수 제한)
+    async def answer(item, vector, metrics, route_result, docs):
+        try:
+            async with semaphore:
+                with metrics.stage("context"):
+                    context, compression = assemble_context(item["question"], docs)
+                metrics.set_compression(compression)
+                with metrics.stage("generation"):
+                    chain = run_qa_chain.build_answer_chain(item["question"], context)
+                    answer_text = await chain.ainvoke({}, config={"callbacks": metrics.callbacks})
+            image_paths, image_names = run_qa_chain.collect_images(docs)
+        except Exception as e:
+            metrics.fail(e)
+            return error_record(item, e)
+        result = run_qa_chain.build_result(answer_text, route_result, docs, image_paths, image_names)
+        if use_cache:
+            answer_cache.put(item["question"], routing_mode, version, result, vector)
+        return make_record(item, {**result, "cache": None, "metrics": metrics.finish()})
+
+    tasks = []
+    for document, docs_lists in zip(documents, retrieved):
+        if isinstance(docs_lists, Exception):
+            for item, _, metrics, _ in groups[document]:
+                metrics.fail(docs_lists)
+                yield error_record(item, docs_lists)
+            continue
+        tasks.extend(asyncio.ensure_future(answer(*member, docs))
+                     for member, docs in zip(groups[document], docs_lists))
+
+    # 끝나는 순서대로 내보냄
+    for task in asyncio.as_completed(tasks):
+        yield await task
+
+
+# ✅ 파일 → 파일 (결과를 한 줄씩 덧붙이고 바로 flush, 이미 답한 id는 건너뜀)
+async def arun_batch(input_path: Path, output_path: Path, routing_mode: str = None,
+                     concurrency: int = BATCH_CONCURRENCY, batch_size: int = BATCH_SIZE,
+                     use_cache: bool = True, on_record: Optional[Callable[[Dict], None]] = None) -> Dict:
+    started = time.perf_counter()
+    items = load_questions(input_path)
+    repair_tail(output_path)
+    done = completed_ids(output_path)
+    # 같은 id가 여러 번 있으면 한 번만
+    todo = list({item["id"]: item for item in items if item["id"] not in done}.values())
+
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"total": len(items), "skipped": len(items) - len(todo), "answered": 0, "cached": 0, "errors": 0}
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "a", encoding="utf-8") as f:
+        for i in range(0, len(todo), batch_size):
+            async for record in aanswer_batch(todo[i:i + batch_size], routing_mode, semaphore, use_cache):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                if "error" in record:
+                    stats["errors"] += 1
+                elif record["cache"]:
+                    stats["cached"] += 1
+                else:
+                    stats["answered"] += 1
+                if on_record is not None:
+                    on_record(record)
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
@@ -0,0 +1,138 @@
+# 로컬 BM25 역색인
+# 1.	🔤 한국어는 한글 음절 바이그램, 영문/숫자는 부품명·코드(예: "A-123", "12v") 단위 토큰으로 나눕니다 (rag.tokens.tokenize).
+# 2.	🗂 인덱싱 시점에 청크 전체의 역색인(CSR 형태 posting 배열)을 만들어 .npz 파일로 저장합니다.
+# 3.	⚡ 질의 시에는 질문 토큰의 posting만 numpy로 더해 점수를 내므로 외부 서비스 없이 프로세스 안에서 바로 검색합니다.
+
+import os
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.clients import DATA_DIR
+from rag.tokens import tokenize
+
+BM25_PATH = DATA_DIR / "chroma_db" / "ev6_bm25.npz"
+
+
+# ✅ 역색인 생성 (term → [(청크 번호, 빈도), ...])
+def build_bm25(ids: List[str], texts: List[str], metadatas: List[Dict]) -> Dict[str, np.ndarray]:
+    postings = defaultdict(list)
+    doc_len = np.zeros(len(ids), dtype=np.float32)
+    for i, text in enumerate(texts):
+        counts = Counter(tokenize(text or ""))
+        doc_len[i] = sum(counts.values())
+        for term, tf in counts.items():
+            postings[term].append((i, tf))
+
+    vocab = sorted(postings)
+    term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    for t, term in enumerate(vocab):
+        term_ptr[t + 1] = term_ptr[t] + len(postings[term])
+    post_doc = np.empty(term_ptr[-1], dtype=np.int32)
+    post_tf = np.empty(term_ptr[-1], dtype=np.float32)
+    for t, term in enumerate(vocab):
+        docs, tfs = zip(*postings[term])
+        post_doc[term_ptr[t]:term_ptr[t + 1]] = docs
+        post_tf[term_ptr[t]:term_ptr[t + 1]] = tfs
+
+    return {
+        "ids": np.array(ids),
+        "doc_names": np.array([(meta or {}).get("document", "") for meta in metadatas]),
+        "doc_len": doc_len,
+        "vocab": np.array(vocab),
+        "term_ptr": term_ptr,
+        "post_doc": post_doc,
+        "post_tf": post_tf,
+    }
+
+
+def save_bm25(index: Dict[str, np.ndarray], collection_count: int, path: Path = BM25_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp_path, collection_count=np.array(collection_count), **index)
+    os.replace(tmp_path, path)
+
+
+def compute_and_save_bm25(vectordb, path: Path = BM25_PATH) -> Dict[str, np.ndarray]:
+    data = vectordb.get(include=["documents", "metadatas"])
+    index = build_bm25(data["ids"], data["documents"], data["metadatas"])
+    save_bm25(index, len(data["ids"]), path)
+    return index
+
+
+class BM25Index:
+    """저장된 역색인을 한 번 로드해 재사용하고, 컬렉션 크기나 파일이 바뀌면 다시 읽는 BM25 검색기"""
+
+    def __init__(self, vectordb, path: Path = BM25_PATH, k1: float = 1.2, b: float = 0.75):
+        self.vectordb = vectordb
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._index: Optional[Dict] = None
+        self._collection_count = -1
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict:
+        count = self.vectordb._collection.count()
+        mtime = self.path.stat().st_mtime if self.path.exists() else None
+        if self._index is not None and count == self._collection_count and mtime == self._mtime:
+            return self._index
+
+        with self._lock:
+            arrays = None
+            if self.path.exists():
+                with np.load(self.path) as data:
+                    if int(data["collection_count"]) == count:
+                        arrays = {key: data[key] for key in data.files if key != "collection_count"}
+            if arrays is None:
+                print("🔄 BM25 역색인 재생성 중...")
+                arrays = compute_and_save_bm25(self.vectordb, self.path)
+                mtime = self.path.stat().st_mtime
+            self._index = self._prepare(arrays)
+            self._collection_count = count
+            self._mtime = mtime
+        return self._index
+
+    def _prepare(self, arrays: Dict[str, np.ndarray]) -> Dict:
+        n = len(arrays["ids"])
+        doc_len = arrays["doc_len"]
+        avg_len = float(doc_len.mean()) if n else 0.0
+        df = np.diff(arrays["term_ptr"]).astype(np.float32)
+        by_document = defaultdict(list)
+        for i, name in enumerate(arrays["doc_names"]):
+            by_document[str(name)].append(i)
+        return {
+            **arrays,
+            "terms": {str(term): t for t, term in enumerate(arrays["vocab"])},
+            "idf": np.log1p((n - df + 0.5) / (df + 0.5)),
+            # 문서 길이 정규화 항 k1 * (1 - b + b * len / avg_len) 미리 계산
+            "norm": self.k1 * (1 - self.b + self.b * doc_len / max(avg_len, 1e-6)),
+            "by_document": {name: np.array(rows) for name, rows in by_document.items()},
+        }
+
+    def search(self, query: str, k: int = 10, document: Optional[str] = None) -> List[Tuple[str, float]]:
+        """(chunk_id, BM25 점수) 목록을 점수 내림차순으로 반환, document가 있으면 그 문서 청크만"""
+        index = self._load()
+        scores = np.zeros(len(index["ids"]), dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = index["terms"].get(term)
+            if t is None:
+                continue
+            start, end = index["term_ptr"][t], index["term_ptr"][t + 1]
+            docs = index["post_doc"][start:end]
+            tf = index["post_tf"][start:end]
+            scores[docs] += index["idf"][t] * tf * (self.k1 + 1) / (tf + index["norm"][docs])
+
+        if document is not None:
+            candidates = index["by_document"].get(document, np.zeros(0, dtype=np.int64))
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[scores[candidates] > 0]
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(str(index["ids"][i]), float(scores[i])) for i in order]
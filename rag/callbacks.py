@@ -0,0 +1,50 @@
+# LangChain 콜백 (rag.metrics가 질문마다 처음 계측할 때 import)
+# 1.	🔢 TokenUsageHandler: LLM 호출마다 프롬프트/완성 토큰을 셉니다 (응답에 usage가 있으면 그 값, 없으면 tiktoken 근사).
+
+import threading
+from typing import Dict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from rag.tokens import count_tokens
+
+
+# ✅ LLM 호출별 토큰 집계 콜백
+class TokenUsageHandler(BaseCallbackHandler):
+    run_inline = True
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+        self._estimates = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._estimates[run_id] = count_tokens("\n".join(
+            str(message.content) for batch in messages for message in batch))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._estimates[run_id] = count_tokens("\n".join(prompts))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        estimate = self._estimates.pop(run_id, 0)
+        generations = [generation for batch in response.generations for generation in batch]
+        usage = None
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None and getattr(message, "usage_metadata", None):
+                usage = message.usage_metadata
+        if usage:
+            prompt, completion = usage["input_tokens"], usage["output_tokens"]
+        else:
+            prompt = estimate
+            completion = count_tokens("".join(generation.text for generation in generations))
+        with self._lock:
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+            self.llm_calls += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"prompt": self.prompt_tokens, "completion": self.completion_tokens,
+                "llm_calls": self.llm_calls}
@@ -0,0 +1,101 @@
+# 섹션 → 문서 목록 카탈로그
+# 1.	🗂 인덱싱 시점에 메타데이터에서 섹션별 문서명 집합과 문서별 청크 수를 만들어 JSON 파일로 저장합니다.
+# 2.	⚡ 질의 시에는 카탈로그를 한 번만 로드하고, 컬렉션이 바뀐 경우에만 다시 읽거나 재생성합니다.
+
+import json
+import os
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from rag.clients import DATA_DIR
+
+CATALOG_PATH = DATA_DIR / "chroma_db" / "ev6_catalog.json"
+
+
+# ✅ 메타데이터 → {섹션: [문서명, ...]}
+def build_catalog(metadatas: Iterable[Dict]) -> Dict[str, List[str]]:
+    sections = defaultdict(set)
+    for meta in metadatas:
+        if not meta:
+            continue
+        section = meta.get("section", "")
+        document = meta.get("document", "")
+        if section and document:
+            sections[section].add(document)
+    return {section: sorted(docs) for section, docs in sorted(sections.items())}
+
+
+# ✅ 메타데이터 → {문서명: 청크 수}
+def count_documents(metadatas: Iterable[Dict]) -> Dict[str, int]:
+    return dict(Counter(meta.get("document", "") for meta in metadatas if meta and meta.get("document")))
+
+
+# ✅ 카탈로그 저장 (임시 파일에 쓴 뒤 교체)
+def save_catalog(catalog: Dict[str, List[str]], collection_count: int,
+                 path: Path = CATALOG_PATH, document_sizes: Optional[Dict[str, int]] = None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"collection_count": collection_count, "sections": catalog,
+                   "document_sizes": document_sizes or {}},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_catalog(path: Path = CATALOG_PATH) -> Optional[Dict]:
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SectionCatalog:
+    """프로세스 내에서 한 번 로드해 재사용하는 섹션 → 문서 카탈로그"""
+
+    def __init__(self, vectordb, path: Path = CATALOG_PATH):
+        self.vectordb = vectordb
+        self.path = path
+        self._sections: Dict[str, List[str]] = {}
+        self._document_sizes: Dict[str, int] = {}
+        self._collection_count = -1
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def documents(self, section: str) -> List[str]:
+        self._refresh_if_stale()
+        return self._sections.get(section.strip().lower(), [])
+
+    def sections(self) -> Dict[str, List[str]]:
+        self._refresh_if_stale()
+        return self._sections
+
+    def document_size(self, document: str) -> int:
+        """문서의 청크 수"""
+        self._refresh_if_stale()
+        return self._document_sizes.get(document, 0)
+
+    def _refresh_if_stale(self):
+        count = self.vectordb._collection.count()
+        mtime = self.path.stat().st_mtime if self.path.exists() else None
+        if count == self._collection_count and mtime == self._mtime:
+            return
+
+        with self._lock:
+            # 파일이 새로 쓰였으면 다시 읽기
+            data = load_catalog(self.path)
+            # 청크 수가 없는 예전 카탈로그도 재생성
+            if data is not None and data.get("collection_count") == count and "document_sizes" in data:
+                self._sections = data["sections"]
+                self._document_sizes = data["document_sizes"]
+            else:
+                # 카탈로그가 없거나 컬렉션과 어긋나면 한 번만 재생성
+                print("🔄 섹션 카탈로그 재생성 중...")
+                metadatas = self.vectordb.get(include=["metadatas"])["metadatas"]
+                self._sections = build_catalog(metadatas)
+                self._document_sizes = count_documents(metadatas)
+                save_catalog(self._sections, count, self.path, self._document_sizes)
+                mtime = self.path.stat().st_mtime
+            self._collection_count = count
+            self._mtime = mtime
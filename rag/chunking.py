@@ -0,0 +1,187 @@
+# 임베딩 전 청킹 단계
+# 1.	📄 PDF 단위 추출 결과를 페이지별로 나누고, 페이지 안에서는 제목 줄을 경계로 블록을 나눕니다.
+# 2.	✂️ 토큰 기준 chunk_size를 넘는 블록은 줄/문장 단위로 다시 자르고, 작은 블록은 chunk_size까지 이어 붙입니다.
+# 3.	🔁 새 청크는 이전 청크의 마지막 문장들(chunk_overlap 토큰 이내)로 시작해 문맥을 이어 줍니다.
+# 4.	🗂 각 청크에는 시작/끝 페이지와 해당 페이지들의 이미지 목록을 메타데이터로 남깁니다.
+#       	(텍스트 없이 이미지만 있는 페이지는 앞 청크에, 앞 청크가 없으면 첫 청크에 이미지를 붙임)
+# 5.	🔑 청크 id는 (원본 경로, 청크 순번)으로 정해져 다시 인덱싱해도 같은 id로 upsert 됩니다.
+
+import bisect
+import hashlib
+import os
+import re
+import unicodedata
+from typing import Dict, List
+
+from rag.tokens import count_tokens
+
+CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "50"))
+
+# ✅ 제목으로 보는 줄: 번호 제목(1. / 2.3), 기호 제목(■ ▶ ◆ ●), 정비 절차 키워드 단독 줄
+HEADING_RE = re.compile(
+    r"^(\d+(\.\d+)*\.?\s+\S.{0,40}|[■□▶▷◆◇●○※]\s*\S.{0,40}"
+    r"|(개요|사양|구성부품|구성 부품|위치|탈거|장착|점검|교환|분해|조립|조정|주의|경고|특수공구|회로도))$"
+)
+NUMBERED_RE = re.compile(r"^\d+(\.\d+)*\.?\s")
+# 번호 뒤 본문이 문장인 경우: 마침표 등으로 끝나거나, 두 어절 이상이면서 동사 어미("~한다", "~합니다", "~하세요", "~하십시오")로 끝남
+# ("1. 개요" 같은 한 어절 제목은 "요"로 끝나도 제목)
+SENTENCE_FINAL_RE = re.compile(r"[.!?。]$|\S\s+\S*[가-힣](다|세요|십시오)$")
+# ✅ 문장 경계: 줄바꿈 또는 마침표 뒤 공백 (단, "1. " 같은 번호 뒤는 제외)
+SENTENCE_END_RE = re.compile(r"\n|(?<=[^\d\s][.!?])\s+")
+
+
+def make_chunk_id(source: str, chunk_index: int) -> str:
+    source = unicodedata.normalize("NFC", source)
+    return f"{hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]}-{chunk_index:05d}"
+
+
+def is_heading(line: str) -> bool:
+    """번호로 시작하는 줄은 문장으로 끝나지 않을 때만 제목 (\"1. 캘리퍼 볼트를 푼다.\" 같은 절차 단계는 제외)"""
+    if not HEADING_RE.match(line):
+        return False
+    numbered = NUMBERED_RE.match(line)
+    return not (numbered and SENTENCE_FINAL_RE.search(line[numbered.end():].strip()))
+
+
+def _split_blocks(text: str) -> List[Dict]:
+    """페이지 텍스트를 제목 줄 기준 블록으로 나눔"""
+    blocks = []
+    current = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if is_heading(line) and current:
+            blocks.append({"text": "\n".join(current), "heading": is_heading(current[0])})
+            current = []
+        current.append(line)
+    if current:
+        blocks.append({"text": "\n".join(current), "heading": is_heading(current[0])})
+    return blocks
+
+
+def _sentences(text: str) -> List[str]:
+    """구분자를 포함한 문장 단위로 나눔 (이어 붙이면 원문과 같음)"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return [s for s in sentences if s.strip()]
+
+
+def _split_oversized(text: str, chunk_size: int) -> List[str]:
+    """chunk_size 토큰을 넘는 블록을 줄 → 문장 → 글자 단위로 나눔"""
+    if count_tokens(text) <= chunk_size:
+        return [text]
+
+    pieces = []
+    current = ""
+    for sentence in _sentences(text):
+        if count_tokens(sentence) > chunk_size:
+            # 문장 하나가 너무 긴 경우 글자 수 기준으로 자름
+            if current.strip():
+                pieces.append(current.strip())
+            current = ""
+            step = max(1, len(sentence) * chunk_size // count_tokens(sentence))
+            pieces.extend(sentence[i:i + step].strip() for i in range(0, len(sentence), step))
+            continue
+        if current and count_tokens(current + sentence) > chunk_size:
+            pieces.append(current.strip())
+            current = sentence
+        else:
+            current += sentence
+    if current.strip():
+        pieces.append(current.strip())
+    return pieces
+
+
+def _overlap_tail(text: str, chunk_overlap: int) -> str:
+    """이전 청크 끝에서 chunk_overlap 토큰 이내의 문장들을 가져옴"""
+    if chunk_overlap <= 0:
+        return ""
+    tail = []
+    used = 0
+    for sentence in reversed(_sentences(text)):
+        tokens = count_tokens(sentence)
+        if used + tokens > chunk_overlap:
+            break
+        tail.insert(0, sentence)
+        used += tokens
+    return "".join(tail).strip()
+
+
+def chunk_pages(pages: List[Dict], chunk_size: int = CHUNK_SIZE,
+                chunk_overlap: int = CHUNK_OVERLAP) -> List[Dict]:
+    """pages: [{"page": 1, "text": ..., "image_paths": [...]}, ...] → 청크 목록"""
+    # 큰 블록은 겹침 문장이 들어갈 자리를 남기고 자름
+    piece_size = max(1, chunk_size - chunk_overlap)
+    pieces = []
+    for page in pages:
+        for block in _split_blocks(page.get("text", "")):
+            for i, piece in enumerate(_split_oversized(block["text"], piece_size)):
+                pieces.append({
+                    "text": piece,
+                    "page": page.get("page", 0),
+                    "heading": block["heading"] and i == 0,
+                    "tokens": count_tokens(piece)
+                })
+
+    page_images = {page.get("page", 0): page.get("image_paths", []) for page in pages}
+    chunks = []
+    current = None
+
+    def flush():
+        if current:
+            pages_in_chunk = range(current["page"], current["page_end"] + 1)
+            chunks.append({
+                "text": "\n".join(current["parts"]),
+                "page": current["page"],
+                "page_end": current["page_end"],
+                "image_paths": [p for n in pages_in_chunk for p in page_images.get(n, [])]
+            })
+
+    for piece in pieces:
+        if current is not None:
+            fits = current["tokens"] + piece["tokens"] <= chunk_size
+            # 청크가 절반 이상 찼으면 새 제목에서 끊음
+            heading_break = piece["heading"] and current["tokens"] >= chunk_size // 2
+            if fits and not heading_break:
+                current["parts"].append(piece["text"])
+                current["tokens"] += piece["tokens"]
+                current["page_end"] = piece["page"]
+                continue
+            flush()
+            tail = _overlap_tail("\n".join(current["parts"]), chunk_overlap)
+            if tail and count_tokens(tail) + piece["tokens"] > chunk_size:
+                tail = ""
+        else:
+            tail = ""
+
+        current = {
+            "parts": ([tail] if tail else []) + [piece["text"]],
+            "tokens": count_tokens(tail) + piece["tokens"],
+            "page": piece["page"],
+            "page_end": piece["page"]
+        }
+    flush()
+    _attach_orphan_images(chunks, pages)
+    return chunks
+
+
+def _attach_orphan_images(chunks: List[Dict], pages: List[Dict]):
+    """어느 청크의 페이지 범위에도 없는 페이지(이미지만 있는 페이지)의 이미지를 이웃 청크에 붙임"""
+    if not chunks:
+        return
+    covered = {n for chunk in chunks for n in range(chunk["page"], chunk["page_end"] + 1)}
+    page_ends = [chunk["page_end"] for chunk in chunks]
+    for page in pages:
+        number = page.get("page", 0)
+        if number in covered or not page.get("image_paths"):
+            continue
+        # 이 페이지 앞에서 끝나는 마지막 청크 (없으면 첫 청크)
+        target = chunks[max(bisect.bisect_left(page_ends, number) - 1, 0)]
+        target["image_paths"].extend(p for p in page["image_paths"] if p not in target["image_paths"])
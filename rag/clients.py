@@ -0,0 +1,114 @@
+# 프로세스 단위 싱글턴 클라이언트
+# 1.	💤 임베딩 모델, LLM, Chroma 벡터 DB는 처음 필요할 때 한 번만 만들고 프로세스 안에서 재사용합니다.
+# 2.	⚡ 무거운 라이브러리(langchain, chromadb)는 getter 안에서 import 하므로 모듈 import 자체는 가볍습니다.
+# 3.	🔌 OpenAI/Azure 호출은 동기·비동기 각각 하나의 httpx 커넥션 풀을 공유합니다 (keep-alive 재사용).
+
+import os
+import threading
+from functools import wraps
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ✅ 경로 설정 (RAG_DATA_DIR로 데이터 폴더 전체를 바꿀 수 있음, 예: 벤치마크용 임시 폴더)
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(os.getenv("RAG_DATA_DIR") or BASE_DIR / "data")
+CHROMA_DIR = DATA_DIR / "chroma_db" / "ev6"
+
+LLM_MODEL = os.getenv("RAG_LLM_MODEL", "gpt-4o")
+HTTP_MAX_CONNECTIONS = int(os.getenv("RAG_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_TIMEOUT = float(os.getenv("RAG_HTTP_TIMEOUT", "60"))
+# 1이면 API 호출 없이 rag.fakes의 결정적 모델 사용 (오프라인 벤치마크/CI)
+FAKE_MODELS = os.getenv("RAG_FAKE_MODELS") == "1"
+# chroma: Chroma 영구 저장소 / bundle: 내보낸 읽기 전용 벡터 번들 (rag.vector_bundle, 질의 전용 노드용)
+VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma")
+
+
+def singleton(factory):
+    """factory를 처음 호출할 때 한 번만 실행 (스레드 안전), reset()으로 초기화"""
+    lock = threading.Lock()
+    instance = []
+
+    @wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    get.reset = instance.clear
+    return get
+
+
+# ✅ 공유 HTTP 커넥션 풀 (동기: Streamlit/스크립트, 비동기: FastAPI 서비스)
+def _http_limits():
+    import httpx
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+
+
+@singleton
+def get_http_client():
+    import httpx
+    return httpx.Client(limits=_http_limits(), timeout=HTTP_TIMEOUT)
+
+
+@singleton
+def get_async_http_client():
+    import httpx
+    return httpx.AsyncClient(limits=_http_limits(), timeout=HTTP_TIMEOUT)
+
+
+# ✅ 임베딩 모델 (디스크 캐시 적용)
+@singleton
+def get_embedding_model():
+    from langchain_openai import AzureOpenAIEmbeddings
+    from rag.embedding_cache import CachedEmbeddings
+
+    if FAKE_MODELS:
+        from rag.fakes import FakeEmbeddings
+        return CachedEmbeddings(FakeEmbeddings(), namespace="fake")
+    return CachedEmbeddings(AzureOpenAIEmbeddings(
+        azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_API_BASE"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client()
+    ), namespace=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"))
+
+
+# ✅ LLM 모델
+@singleton
+def get_llm():
+    from langchain_openai import ChatOpenAI
+
+    if FAKE_MODELS:
+        from rag.fakes import FakeChatModel
+        return FakeChatModel()
+    return ChatOpenAI(
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        temperature=0.2,
+        model_name=LLM_MODEL,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client()
+    )
+
+
+# ✅ Chroma 벡터 DB (HNSW 인덱스는 프로세스당 한 번만 열림)
+# RAG_VECTOR_BACKEND=bundle 이면 chromadb 없이 memory-map 번들을 엶 (같은 읽기 API)
+@singleton
+def get_vectordb():
+    if VECTOR_BACKEND == "bundle":
+        from rag.vector_bundle import VectorBundle
+        return VectorBundle(embedding_function=get_embedding_model())
+
+    from langchain_community.vectorstores import Chroma
+
+    return Chroma(
+        persist_directory=str(CHROMA_DIR),
+        embedding_function=get_embedding_model()
+    )
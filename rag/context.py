@@ -0,0 +1,117 @@
+# 답변 생성 전 문맥 조립 (토큰 예산 + 추출식 압축)
+# 1.	✂️ 검색된 청크를 문장 단위로 나누고, 청크 겹침(chunk_overlap) 때문에 반복되는 문장은 한 번만 남깁니다.
+# 2.	🎯 토큰 예산을 넘으면 질문과의 관련도(문장 단위 BM25, rag.tokens.tokenize)가 높은 문장부터 예산 안에서 고릅니다.
+#       	(동점이면 검색 순위가 높은 청크, 앞쪽 문장 우선) 고른 문장은 원래 순서대로 청크별로 다시 이어 붙입니다.
+#       	(줄바꿈으로 나뉜 문장은 줄바꿈으로 이어 번호 절차/표 모양을 유지, 빠진 문장이 없는 청크는 원문 그대로)
+# 3.	📊 원래/압축 후 토큰 수, 아낀 토큰 수, 중복 문장 수를 보고해 생성 지연 시간과 비용을 예측할 수 있게 합니다.
+#
+# RAG_CONTEXT_TOKENS=0 이면 예산 없이 중복 제거만 합니다.
+
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from rag.chunking import SENTENCE_END_RE
+from rag.tokens import count_tokens, tokenize
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "2000"))
+# 이보다 짧은 문장은 완전히 같을 때만 중복으로 봄 (짧은 조각이 우연히 포함되는 경우 방지)
+MIN_CONTAINED_CHARS = 20
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def split_sentences(text: str) -> List[Tuple[str, str]]:
+    """(문장, 뒤 구분자) 목록 — 줄바꿈으로 끝난 문장은 "\n", 문장부호 뒤 공백이면 " " (번호 절차/표의 줄 유지)"""
+    segments = []
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        sentence = text[start:match.start()].strip()
+        if sentence:
+            segments.append((sentence, "\n" if "\n" in match.group() else " "))
+        start = match.end()
+    if text[start:].strip():
+        segments.append((text[start:].strip(), " "))
+    return segments
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(sentence.split()).lower()
+
+
+# ✅ 문장별 질문 관련도 (후보 문장들만으로 계산한 BM25)
+def score_sentences(query: str, sentences: List[str]) -> List[float]:
+    query_tokens = set(tokenize(query))
+    counts = [Counter(tokenize(sentence)) for sentence in sentences]
+    if not query_tokens or not counts:
+        return [0.0] * len(sentences)
+    lengths = [sum(count.values()) for count in counts]
+    avg_length = (sum(lengths) / len(lengths)) or 1.0
+    df = Counter(token for count in counts for token in query_tokens if token in count)
+    idf = {token: math.log(1 + (len(counts) - n + 0.5) / (n + 0.5)) for token, n in df.items()}
+
+    scores = []
+    for count, length in zip(counts, lengths):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+        scores.append(sum(weight * count[token] * (BM25_K1 + 1) / (count[token] + norm)
+                          for token, weight in idf.items() if token in count))
+    return scores
+
+
+# ✅ 문맥 조립: (문맥 텍스트, 보고서)
+def assemble_context(query: str, docs, budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    candidates = []  # (청크 순위, 문장 순번, 문장, 토큰 수, 뒤 구분자)
+    seen = set()
+    seen_text = ""
+    total_sentences = 0
+    sentences_per_chunk = Counter()
+    for rank, doc in enumerate(docs):
+        for position, (sentence, separator) in enumerate(split_sentences(doc.page_content)):
+            total_sentences += 1
+            sentences_per_chunk[rank] += 1
+            normalized = _normalize(sentence)
+            if normalized in seen or (len(normalized) >= MIN_CONTAINED_CHARS and normalized in seen_text):
+                continue
+            seen.add(normalized)
+            seen_text += normalized + "\n"
+            candidates.append((rank, position, sentence, count_tokens(sentence), separator))
+
+    selected = candidates
+    if budget > 0 and sum(candidate[3] for candidate in candidates) > budget:
+        scores = score_sentences(query, [candidate[2] for candidate in candidates])
+        order = sorted(range(len(candidates)),
+                       key=lambda i: (-scores[i], candidates[i][0], candidates[i][1]))
+        keep = set()
+        used = 0
+        for i in order:
+            tokens = candidates[i][3]
+            # 예산에 맞는 문장만 (가장 관련 있는 문장 하나는 예산을 넘어도 포함)
+            if used + tokens <= budget or not keep:
+                keep.add(i)
+                used += tokens
+        selected = [candidate for i, candidate in enumerate(candidates) if i in keep]
+
+    # 빠진 문장이 없는 청크는 원문 그대로, 나머지는 남은 문장을 원래 뒤에 있던 구분자(줄바꿈/공백)로 이어 붙임
+    kept_per_chunk = Counter(candidate[0] for candidate in selected)
+    passages: Dict[int, str] = {}
+    for rank, _, sentence, _, separator in selected:
+        if kept_per_chunk[rank] == sentences_per_chunk[rank]:
+            passages[rank] = docs[rank].page_content
+        else:
+            passages[rank] = passages.get(rank, "") + sentence + separator
+    original = "\n\n".join(doc.page_content for doc in docs)
+    context = "\n\n".join(passage.strip() for passage in passages.values())
+
+    tokens_before = count_tokens(original)
+    tokens_after = count_tokens(context)
+    report = {
+        "budget": budget,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(tokens_before - tokens_after, 0),
+        "sentences": total_sentences,
+        "kept": len(selected),
+        "duplicates": total_sentences - len(candidates)
+    }
+    return context, report
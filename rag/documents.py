@@ -0,0 +1,58 @@
+# 참고 문서(PDF) 제공
+# 1.	📄 청크 메타데이터의 source(상대 경로)를 실제 PDF 경로로 바꿉니다 (PDF 폴더 밖을 가리키면 거부).
+# 2.	✂️ 인용된 페이지만 잘라낸 작은 PDF를 만들어 캐시합니다. 매뉴얼 전체를 메모리에 올리지 않아도 됩니다.
+# 3.	🔗 API의 GET /documents/... 주소(#page=N 으로 인용 페이지 바로 열기)를 만듭니다.
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+import fitz  # PyMuPDF
+
+from rag.clients import BASE_DIR, DATA_DIR
+
+PDF_DIR = DATA_DIR / "pdfs"
+# 잘라낸 페이지 PDF 캐시 개수
+EXCERPT_CACHE_SIZE = int(os.getenv("RAG_EXCERPT_CACHE_SIZE", "128"))
+
+
+def resolve_pdf(source: str) -> Optional[Path]:
+    """source → PDF_DIR 안의 실제 PDF 경로 (없거나 폴더 밖이면 None)"""
+    if not source or not source.lower().endswith(".pdf"):
+        return None
+    root = PDF_DIR.resolve()
+    candidates = [Path(source)] if Path(source).is_absolute() else [Path.cwd() / source, BASE_DIR / source]
+    for candidate in candidates:
+        path = candidate.resolve()
+        if path.is_relative_to(root) and path.is_file():
+            return path
+    return None
+
+
+def page_range(page: Optional[int], page_end: Optional[int], page_count: int):
+    """1부터 시작하는 인용 페이지 범위를 문서 범위 안으로 맞춤"""
+    first = min(max(int(page or 1), 1), page_count)
+    last = min(max(int(page_end or first), first), page_count)
+    return first, last
+
+
+@lru_cache(maxsize=EXCERPT_CACHE_SIZE)
+def _excerpt(path: str, mtime: float, first: int, last: int) -> bytes:
+    with fitz.open(path) as src, fitz.open() as out:
+        out.insert_pdf(src, from_page=first - 1, to_page=last - 1)
+        return out.tobytes(garbage=3, deflate=True)
+
+
+def page_excerpt(path: Path, page: Optional[int], page_end: Optional[int] = None) -> bytes:
+    """인용 페이지(page ~ page_end)만 담은 PDF 바이트 (파일이 바뀌면 mtime이 달라져 다시 생성)"""
+    with fitz.open(path) as doc:
+        first, last = page_range(page, page_end, len(doc))
+    return _excerpt(str(path), path.stat().st_mtime, first, last)
+
+
+def document_url(source: str, page: Optional[int] = None, base_url: str = "") -> str:
+    """API에서 PDF를 여는 주소 (브라우저 PDF 뷰어가 #page=N 으로 인용 페이지를 바로 엶)"""
+    url = f"{base_url.rstrip('/')}/documents/{quote(source)}"
+    return f"{url}#page={page}" if page else url
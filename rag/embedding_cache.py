@@ -0,0 +1,196 @@
+# 디스크 임베딩 캐시
+# 1.	🔑 (모델/배포명, 정규화한 텍스트의 SHA-256)을 키로 임베딩 벡터를 SQLite 파일에 저장합니다.
+# 2.	♻️ 인덱싱(store_to_vectordb)과 질의(run_custom_qa, test.py)가 같은 캐시를 공유해 같은 텍스트는 다시 임베딩하지 않습니다.
+# 3.	🧹 파일 크기가 max_bytes를 넘으면 가장 오래 쓰지 않은 항목부터 지웁니다 (LRU).
+# 4.	📊 hits / misses / hit_rate 통계를 제공합니다.
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from rag.clients import DATA_DIR
+
+EMBED_CACHE_PATH = DATA_DIR / "cache" / "embeddings.sqlite"
+EMBED_CACHE_MAX_MB = int(os.getenv("RAG_EMBED_CACHE_MB", "512"))
+
+# SQLite 한 쿼리에 넣을 수 있는 변수 수 제한을 넘지 않도록 나눠 조회
+_LOOKUP_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(namespace: str, text: str) -> str:
+    return hashlib.sha256(f"{namespace}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """임베딩 모델을 감싸 SQLite 디스크 캐시(LRU, 크기 제한)를 적용"""
+
+    def __init__(self, embeddings: Embeddings, namespace: str,
+                 path: Path = EMBED_CACHE_PATH, max_bytes: int = EMBED_CACHE_MAX_MB * 1024 * 1024):
+        self.embeddings = embeddings
+        self.namespace = namespace or type(embeddings).__name__
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+
+    # ✅ 조회 / 저장
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique_keys), _LOOKUP_BATCH):
+                batch = unique_keys[i:i + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(time.time(), key) for key, _ in rows]
+                    )
+            self._conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = array("f", vector).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 용량의 90%까지 오래된 항목부터 삭제
+        target = total - int(self.max_bytes * 0.9)
+        removed = 0
+        keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access"):
+            keys.append((key,))
+            removed += size
+            if removed >= target:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", keys)
+        self._conn.commit()
+
+    # ✅ Embeddings 인터페이스
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.namespace, text) for text in texts]
+        found = self._lookup(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        miss_count = sum(1 for key in keys if key not in found)
+        self._count(len(texts) - miss_count, miss_count)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self._store(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = cache_key(self.namespace, text)
+        found = self._lookup([key])
+        if key in found:
+            self._count(1, 0)
+            return found[key]
+        self._count(0, 1)
+        vector = self.embeddings.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    # ✅ 비동기 버전 (SQLite 조회/저장은 스레드에서, 임베딩 요청은 비동기 클라이언트로)
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.namespace, text) for text in texts]
+        found = await asyncio.to_thread(self._lookup, keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        miss_count = sum(1 for key in keys if key not in found)
+        self._count(len(texts) - miss_count, miss_count)
+
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self._store, new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = cache_key(self.namespace, text)
+        found = await asyncio.to_thread(self._lookup, [key])
+        if key in found:
+            self._count(1, 0)
+            return found[key]
+        self._count(0, 1)
+        vector = await self.embeddings.aembed_query(text)
+        await asyncio.to_thread(self._store, {key: vector})
+        return vector
+
+    # ✅ 통계
+    def _count(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "entries": entries,
+            "bytes": size
+        }
@@ -0,0 +1,169 @@
+# 배치 단위 임베딩 + Chroma 적재
+# 1.	📦 청크를 토큰 예산(max_batch_tokens)과 개수(max_batch_size) 기준으로 배치로 묶습니다.
+# 2.	⚡ 배치 임베딩은 스레드 max_concurrency개로 동시에 요청하고, Chroma upsert는 메인 스레드에서만 합니다.
+# 3.	⏳ 429(rate limit)를 받으면 Retry-After 또는 지수 백오프만큼 모든 워커가 함께 쉬었다가 재시도합니다.
+# 4.	💾 완료된 배치의 청크 id를 체크포인트 파일에 기록해, 중단된 실행은 남은 배치부터 이어서 진행합니다.
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from rag.tokens import count_tokens
+
+EMBED_BATCH_TOKENS = int(os.getenv("RAG_EMBED_BATCH_TOKENS", "8000"))
+EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "256"))
+EMBED_CONCURRENCY = int(os.getenv("RAG_EMBED_CONCURRENCY", "4"))
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def make_batches(documents: List[Document], max_batch_tokens: int = EMBED_BATCH_TOKENS,
+                 max_batch_size: int = EMBED_BATCH_SIZE) -> List[List[Document]]:
+    batches = []
+    current = []
+    current_tokens = 0
+    for doc in documents:
+        tokens = count_tokens(doc.page_content)
+        if current and (current_tokens + tokens > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(doc)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class EmbeddingWriter:
+    """토큰 예산 배치 + 동시 요청 제한 + 429 백오프 + 체크포인트 재개를 지원하는 임베딩 적재기"""
+
+    def __init__(self, embedding_model, collection, checkpoint_path: Optional[Path] = None,
+                 max_batch_tokens: int = EMBED_BATCH_TOKENS, max_batch_size: int = EMBED_BATCH_SIZE,
+                 max_concurrency: int = EMBED_CONCURRENCY, max_retries: int = 8,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.embedding_model = embedding_model
+        self.collection = collection
+        self.checkpoint_path = checkpoint_path
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._pause_until = 0.0
+        self._pause_lock = threading.Lock()
+
+    # ✅ 체크포인트: 한 줄에 완료된 배치 하나 ({"ids": [...], "hashes": [...]})
+    def _load_checkpoint(self) -> Set[Tuple[str, str]]:
+        done = set()
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return done
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 기록 도중 중단된 마지막 줄
+                done.update(zip(record["ids"], record["hashes"]))
+        return done
+
+    def _append_checkpoint(self, batch: List[Document]):
+        if self.checkpoint_path is None:
+            return
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "ids": [doc.metadata["chunk_id"] for doc in batch],
+            "hashes": [_text_hash(doc.page_content) for doc in batch]
+        }
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _wait_for_pause(self):
+        delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pause(self, seconds: float):
+        with self._pause_lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def _embed(self, batch: List[Document]) -> List[List[float]]:
+        texts = [doc.page_content for doc in batch]
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_pause()
+            try:
+                return self.embedding_model.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                    delay *= random.uniform(0.5, 1.0)
+                print(f"⏳ rate limit (429), {delay:.1f}초 대기 후 재시도 ({attempt + 1}/{self.max_retries})")
+                self._pause(delay)
+
+    def _upsert(self, batch: List[Document], embeddings: List[List[float]]):
+        self.collection.upsert(
+            ids=[doc.metadata["chunk_id"] for doc in batch],
+            embeddings=embeddings,
+            metadatas=[doc.metadata for doc in batch],
+            documents=[doc.page_content for doc in batch]
+        )
+
+    def write(self, documents: List[Document]) -> Dict[str, int]:
+        done = self._load_checkpoint()
+        pending = [doc for doc in documents
+                   if (doc.metadata["chunk_id"], _text_hash(doc.page_content)) not in done]
+        skipped = len(documents) - len(pending)
+        if skipped:
+            print(f"♻️ 체크포인트에서 재개: 완료 {skipped}개 건너뜀, 남은 청크 {len(pending)}개")
+
+        batches = make_batches(pending, self.max_batch_tokens, self.max_batch_size)
+        written = 0
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {executor.submit(self._embed, batch): batch for batch in batches}
+            try:
+                for i, future in enumerate(as_completed(futures), 1):
+                    batch = futures[future]
+                    self._upsert(batch, future.result())
+                    self._append_checkpoint(batch)
+                    written += len(batch)
+                    print(f"[{i}/{len(batches)}] 🧠 임베딩 배치 저장 ({written}/{len(pending)})")
+            except BaseException:
+                # 실패 시 아직 시작 안 한 배치는 취소 (완료분은 체크포인트에 남아 있음)
+                for future in futures:
+                    future.cancel()
+                raise
+
+        # 모두 끝났으면 체크포인트 정리 (다음 실행은 처음부터)
+        if self.checkpoint_path is not None and self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+        return {"written": written, "skipped": skipped, "batches": len(batches)}
@@ -0,0 +1,129 @@
+# 오프라인 벤치마크/CI용 결정적(deterministic) 모델
+# 1.	🔢 FakeEmbeddings: 토큰(rag.tokens.tokenize, BM25와 같은 토큰화)을 해시해 고정 차원에 더하는 bag-of-words 임베딩 (API 호출 없음)
+# 2.	🤖 FakeChatModel: 라우팅 프롬프트에서는 질문과 토큰이 가장 많이 겹치는 선택지를 고르고,
+#       	QA 프롬프트에서는 문맥 앞부분으로 답합니다. 같은 입력에는 항상 같은 출력을 냅니다.
+# RAG_FAKE_MODELS=1 이면 rag.clients의 get_embedding_model / get_llm이 이 모델들을 돌려줍니다.
+# RAG_FAKE_LLM_LATENCY_MS를 주면 호출마다 그만큼 기다려 실제 LLM 왕복 시간을 흉내 냅니다 (동시 실행 효과 측정용).
+
+import hashlib
+import os
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from rag.tokens import tokenize
+
+FAKE_EMBEDDING_DIM = 256
+
+
+class FakeEmbeddings(Embeddings):
+    """토큰 해시 기반 결정적 임베딩 (토큰이 많이 겹치는 텍스트일수록 코사인 유사도가 높음)"""
+
+    def __init__(self, dim: int = FAKE_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            vector[0] = 1.0
+            norm = 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# ✅ 질문과 토큰이 가장 많이 겹치는 선택지 (동점이면 앞의 것)
+def best_option(question: str, options: List[str]) -> str:
+    query_tokens = set(tokenize(question))
+    scores = [len(query_tokens & set(tokenize(option))) for option in options]
+    return options[int(np.argmax(scores))] if options else ""
+
+
+def _between(text: str, start: str, end: str) -> str:
+    match = re.search(re.escape(start) + r"(.*?)" + re.escape(end), text, re.S)
+    return match.group(1) if match else ""
+
+
+def _lines(block: str) -> List[str]:
+    return [line.strip().lstrip("- ").strip() for line in block.splitlines() if line.strip()]
+
+
+class FakeChatModel(BaseChatModel):
+    """run_qa_chain의 프롬프트(섹션/문서/구조화 라우팅, QA)에 결정적으로 답하는 채팅 모델"""
+
+    answer_chars: int = 300
+    latency_ms: float = float(os.getenv("RAG_FAKE_LLM_LATENCY_MS", "0"))
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-rag-chat"
+
+    def respond(self, prompt: str) -> str:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if "[문서 내용]" in prompt:
+            context = " ".join(_between(prompt, "[문서 내용]", "[질문]").split())
+            if not context:
+                return "[정비사 답변] 문서에 없는 내용이라 답변 드릴 수 없습니다."
+            return f"[정비사 답변] 문서에 따르면 {context[:self.answer_chars]}"
+        if "선택지:" in prompt:
+            question = _between(prompt, "\n질문:", "\n")
+            return best_option(question, _lines(_between(prompt, "선택지:", "\n질문:")))
+        if "문서 목록입니다:" in prompt:
+            question = _between(prompt, "사용자의 질문:", "\n")
+            return best_option(question, _lines(_between(prompt, "문서 목록입니다:", "사용자의 질문:")))
+        return ""
+
+    def route_catalog(self, prompt: str) -> Dict[str, str]:
+        """structured 라우팅 프롬프트의 [섹션] / - 문서 목록에서 섹션과 문서를 함께 고름"""
+        question = _between(prompt, "사용자의 질문:", "\n")
+        pairs = []
+        section = ""
+        for line in _between(prompt, "문서 목록입니다:", "사용자의 질문:").splitlines():
+            line = line.strip()
+            if line.startswith("[") and line.endswith("]"):
+                section = line[1:-1]
+            elif line.startswith("- "):
+                pairs.append((section, line[2:].strip()))
+        labels = [f"{section} {document}" for section, document in pairs]
+        if not pairs:
+            return {"section": "", "document": ""}
+        section, document = pairs[labels.index(best_option(question, labels))]
+        return {"section": section, "document": document}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self.respond(messages[-1].content)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for token in re.findall(r"\S+\s*", self.respond(messages[-1].content)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(self, schema, **kwargs):
+        def route(value):
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            return schema(**self.route_catalog(value.to_string()))
+
+        return RunnableLambda(route)
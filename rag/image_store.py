@@ -0,0 +1,96 @@
+# 내용 주소 기반(content-addressed) 이미지 저장소
+# 1.	🔑 이미지 바이트의 SHA-256 해시를 파일 이름으로 써서 같은 이미지(반복되는 로고/도면)는 한 번만 저장합니다.
+# 2.	🧾 확장자는 PDF에 들어 있는 실제 형식(png, jpg, jpx ...)을 그대로 씁니다.
+# 3.	📁 <root>/<해시 앞 2자리>/<해시>.<확장자> 로 나눠 저장하고, 임시 파일 → 교체로 써서 병렬 추출에도 안전합니다.
+# 4.	🖼 새 이미지를 저장할 때 UI용 WebP 썸네일(<root>/thumbs/<너비>/<해시 앞 2자리>/<해시>.webp)도 함께 만듭니다.
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from PIL import Image
+
+EXTENSION_ALIASES = {"jpeg": "jpg", "tif": "tiff"}
+
+# 썸네일 너비(px)와 품질 (UI의 이미지 칸은 2열이라 320px이면 충분)
+THUMBNAIL_WIDTHS = (320,)
+THUMBNAIL_WIDTH = THUMBNAIL_WIDTHS[0]
+THUMBNAIL_QUALITY = 75
+# 세로로 아주 긴 이미지(전체 도면 등)는 너비의 4배 높이까지만
+THUMBNAIL_MAX_ASPECT = 4
+
+
+def image_hash(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def thumbnail_path_for(image_path: str, width: int = THUMBNAIL_WIDTH) -> Path:
+    """원본 이미지 경로 → 썸네일 경로 (해시 저장소 밖의 예전 이미지는 같은 폴더 아래 thumbs/)"""
+    path = Path(image_path)
+    root = path.parent.parent if path.stem.startswith(path.parent.name) and len(path.parent.name) == 2 else path.parent
+    return root / "thumbs" / str(width) / path.stem[:2] / f"{path.stem}.webp"
+
+
+def make_thumbnail(image_path: str, width: int = THUMBNAIL_WIDTH) -> Optional[str]:
+    """WebP 썸네일을 만들어 경로 반환 (이미 있으면 그대로, 읽을 수 없는 형식이면 None)"""
+    thumb_path = thumbnail_path_for(image_path, width)
+    if thumb_path.exists():
+        return str(thumb_path)
+    try:
+        with Image.open(image_path) as image:
+            # JPEG는 디코딩 단계에서 축소해서 읽음
+            image.draft("RGB", (width, width * THUMBNAIL_MAX_ASPECT))
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+            image.thumbnail((width, width * THUMBNAIL_MAX_ASPECT), Image.LANCZOS)
+
+            thumb_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = thumb_path.with_name(f"{thumb_path.name}.{os.getpid()}.tmp")
+            image.save(tmp_path, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    os.replace(tmp_path, thumb_path)
+    return str(thumb_path)
+
+
+class ImageStore:
+    """해시 → 이미지 파일 저장소 (이미 있는 해시는 쓰지 않음)"""
+
+    def __init__(self, root: str, thumbnail_widths: Sequence[int] = THUMBNAIL_WIDTHS):
+        self.root = Path(root)
+        self.thumbnail_widths = thumbnail_widths
+        self.written = 0
+        self.reused = 0
+        self.thumbnails = 0
+
+    def path_for(self, digest: str, ext: str) -> Path:
+        ext = EXTENSION_ALIASES.get(ext.lower(), ext.lower())
+        return self.root / digest[:2] / f"{digest}.{ext}"
+
+    def put(self, image_bytes: bytes, ext: str) -> Tuple[str, str]:
+        """이미지를 저장하고 (해시, 파일 경로) 반환"""
+        digest = image_hash(image_bytes)
+        path = self.path_for(digest, ext)
+        if path.exists():
+            self.reused += 1
+            self._make_thumbnails(path)
+            return digest, str(path)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(image_bytes)
+        os.replace(tmp_path, path)
+        self.written += 1
+        self._make_thumbnails(path)
+        return digest, str(path)
+
+    def _make_thumbnails(self, path: Path):
+        # 썸네일 기능 이전에 저장된 이미지도 다시 추출할 때 썸네일이 생김 (이미 있으면 건너뜀)
+        for width in self.thumbnail_widths:
+            if not thumbnail_path_for(str(path), width).exists() and make_thumbnail(str(path), width):
+                self.thumbnails += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.written, "reused": self.reused, "thumbnails": self.thumbnails}
@@ -0,0 +1,103 @@
+# 청크 → 이미지 경로 테이블 (Chroma 메타데이터 대신 SQLite에 따로 저장)
+# 1.	🗃 이미지 경로는 images 테이블에 한 번만 두고, chunk_images에는 (chunk_id, 순서, 이미지 id)만 저장합니다.
+#       	(같은 로고/도면을 여러 청크가 참조해도 경로 문자열은 한 줄)
+# 2.	⚡ 검색된 청크들의 이미지를 chunk_id 목록으로 한 번에 조회합니다 (쉼표로 이어 붙인 문자열을 나누지 않음).
+# 3.	🔁 증분 적재 때는 바뀐 청크의 행만 교체하고, 지워진 청크의 행은 삭제합니다.
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from rag.clients import DATA_DIR
+
+IMAGE_TABLE_PATH = DATA_DIR / "chroma_db" / "ev6_images.sqlite"
+
+# SQLite 한 쿼리에 넣을 수 있는 변수 수 제한을 넘지 않도록 나눠 조회
+_LOOKUP_BATCH = 500
+
+
+class ImageTable:
+    """chunk_id → 이미지 경로 목록 (페이지 순서 유지)"""
+
+    def __init__(self, path: Path = IMAGE_TABLE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS images (
+                image_id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS chunk_images (
+                chunk_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                image_id INTEGER NOT NULL,
+                PRIMARY KEY (chunk_id, position)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+    # ✅ 조회
+    def lookup(self, chunk_ids: Iterable[str]) -> Dict[str, List[str]]:
+        found: Dict[str, List[str]] = {}
+        unique_ids = list(dict.fromkeys(chunk_id for chunk_id in chunk_ids if chunk_id))
+        with self._lock:
+            for i in range(0, len(unique_ids), _LOOKUP_BATCH):
+                batch = unique_ids[i:i + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT c.chunk_id, i.path FROM chunk_images c JOIN images i USING (image_id) "
+                    f"WHERE c.chunk_id IN ({placeholders}) ORDER BY c.chunk_id, c.position", batch
+                ).fetchall()
+                for chunk_id, path in rows:
+                    found.setdefault(chunk_id, []).append(path)
+        return found
+
+    # ✅ 저장 / 삭제 (같은 chunk_id의 기존 행은 교체)
+    def put(self, chunk_images: Dict[str, List[str]]):
+        with self._lock, self._conn:
+            self._delete(list(chunk_images))
+            paths = list(dict.fromkeys(path for paths in chunk_images.values() for path in paths))
+            self._conn.executemany("INSERT OR IGNORE INTO images (path) VALUES (?)", [(p,) for p in paths])
+            image_ids = {}
+            for i in range(0, len(paths), _LOOKUP_BATCH):
+                batch = paths[i:i + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                image_ids.update(self._conn.execute(
+                    f"SELECT path, image_id FROM images WHERE path IN ({placeholders})", batch
+                ).fetchall())
+            self._conn.executemany(
+                "INSERT INTO chunk_images (chunk_id, position, image_id) VALUES (?, ?, ?)",
+                [(chunk_id, position, image_ids[path])
+                 for chunk_id, paths in chunk_images.items() for position, path in enumerate(paths)]
+            )
+
+    def delete(self, chunk_ids: Iterable[str]):
+        with self._lock, self._conn:
+            self._delete(list(chunk_ids))
+
+    def _delete(self, chunk_ids: List[str]):
+        for i in range(0, len(chunk_ids), _LOOKUP_BATCH):
+            batch = chunk_ids[i:i + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM chunk_images WHERE chunk_id IN ({placeholders})", batch)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunk_images")
+            self._conn.execute("DELETE FROM images")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            chunks, refs = self._conn.execute(
+                "SELECT COUNT(DISTINCT chunk_id), COUNT(*) FROM chunk_images").fetchone()
+            images = self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        return {"chunks": chunks, "references": refs, "images": images}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,46 @@
+# 증분 인덱싱용 매니페스트
+# 1.	🔑 PDF별 내용 해시(SHA-256)와 그 PDF에서 나온 청크 id 목록을 JSON 파일로 관리합니다.
+# 2.	🔁 다음 실행 때 해시를 비교해 새로 생기거나 바뀐 PDF만 다시 추출/임베딩하고, 사라진 PDF의 벡터는 지웁니다.
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from rag.clients import DATA_DIR
+
+MANIFEST_PATH = DATA_DIR / "chroma_db" / "ev6_manifest.json"
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict:
+    if not path.exists():
+        return {"pdfs": {}, "chunking": None}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: Dict, path: Path = MANIFEST_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def record_pdf(manifest: Dict, source: str, content_hash: Optional[str], ids):
+    manifest["pdfs"][source] = {"hash": content_hash, "ids": list(ids)}
+
+
+# ✅ 인덱스 버전: 적재할 때마다 매니페스트가 다시 쓰이므로 (수정 시각, 컬렉션 크기)로 재구축 여부 판단
+def index_version(vectordb, path: Path = MANIFEST_PATH):
+    mtime = path.stat().st_mtime_ns if path.exists() else None
+    return (mtime, vectordb._collection.count())
@@ -0,0 +1,207 @@
+# QA 파이프라인 계측
+# 1.	🔭 run_custom_qa의 단계(캐시 조회, 라우팅, 검색, 생성)마다 OpenTelemetry span을 남깁니다.
+#       	(SDK/exporter를 설정하지 않으면 no-op 이라 비용이 거의 없습니다.)
+# 2.	🔢 LangChain 콜백으로 LLM 호출마다 프롬프트/완성 토큰을 셉니다 (응답에 usage가 있으면 그 값, 없으면 tiktoken 근사).
+# 3.	📈 프로세스 내 MetricsCollector가 요청별 지표를 모아 단계별 p50/p95, 토큰 합계(문맥 압축으로 아낀 토큰 포함), 캐시 적중 수를 제공합니다.
+# 4.	🧾 RAG_METRICS_LOG를 설정하면 요청마다 한 줄 JSON으로 기록합니다 ("-": 표준 에러, 그 외: 파일 경로).
+# 5.	🚨 단계에서 예외가 나면 span에 예외와 ERROR 상태를 남기고, 실패한 요청도 fail()로 루트 span을 닫고 "error"와 함께 기록합니다.
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from rag.tokens import count_tokens
+
+METRICS_LOG = os.getenv("RAG_METRICS_LOG", "")
+METRICS_WINDOW = int(os.getenv("RAG_METRICS_WINDOW", "1024"))
+
+
+# 무거운 라이브러리(opentelemetry, langchain, numpy)는 처음 계측할 때 import (모듈 import는 가볍게 유지)
+@lru_cache(maxsize=1)
+def _tracer():
+    from opentelemetry import trace
+    return trace.get_tracer("rag.qa")
+
+
+class QAMetrics:
+    """질문 하나(run_custom_qa 한 번)의 계측: 단계별 span/시간, 토큰, 검색 문맥 크기, 캐시 적중"""
+
+    def __init__(self, query: str, routing_mode: str):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        from rag.callbacks import TokenUsageHandler
+        self.usage = TokenUsageHandler()
+        self.context = {"chunks": 0, "chars": 0, "tokens": 0}
+        self.compression: Dict[str, int] = {}
+        self.cache: Optional[str] = None
+        # 미리 검색(speculative retrieval) 결과: "hit" / "miss" / None(사용 안 함)
+        self.speculative: Optional[str] = None
+        self.routing_mode = routing_mode
+        self._result: Optional[Dict] = None
+        # 제너레이터가 yield를 거치므로 현재 컨텍스트에 붙이지 않고 부모 span을 직접 관리 (중첩 단계는 스택)
+        from opentelemetry import trace
+
+        self.root = _tracer().start_span("rag.qa", attributes={
+            "rag.routing_mode": routing_mode, "rag.query_chars": len(query)})
+        self._parents = [trace.set_span_in_context(self.root)]
+
+    @property
+    def callbacks(self) -> List:
+        return [self.usage]
+
+    @contextmanager
+    def stage(self, name: str, **attributes):
+        from opentelemetry import trace
+
+        span = _tracer().start_span(f"rag.{name}", context=self._parents[-1], attributes=attributes)
+        self._parents.append(trace.set_span_in_context(span))
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as error:
+            _record_error(span, error)
+            raise
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+            self._parents.pop()
+            span.end()
+
+    def set_context(self, docs):
+        text = "\n\n".join(doc.page_content for doc in docs)
+        self.context = {"chunks": len(docs), "chars": len(text), "tokens": count_tokens(text)}
+
+    def set_compression(self, report: Dict[str, int]):
+        self.compression = dict(report)
+
+    def finish(self, **attributes) -> Dict:
+        # 이미 끝난 요청 (실패 처리와 정상 종료가 겹치는 경우)은 처음 결과를 그대로 반환
+        if self._result is not None:
+            return self._result
+        self.timings["total"] = round((time.perf_counter() - self.started) * 1000, 2)
+        metrics = {
+            "timings_ms": dict(self.timings),
+            "tokens": self.usage.as_dict(),
+            "context": dict(self.context),
+            "compression": dict(self.compression),
+            "cache": self.cache,
+            "speculative": self.speculative,
+            "routing_mode": self.routing_mode,
+            "error": attributes.pop("error", None)
+        }
+        self.root.set_attributes({
+            **{f"rag.timing.{name}_ms": value for name, value in metrics["timings_ms"].items()},
+            **{f"rag.tokens.{name}": value for name, value in metrics["tokens"].items()},
+            **{f"rag.context.{name}": value for name, value in metrics["context"].items()},
+            **{f"rag.compression.{name}": value for name, value in metrics["compression"].items()},
+            "rag.cache": self.cache or "none",
+            **({"rag.error": metrics["error"]} if metrics["error"] else {}),
+            **attributes
+        })
+        self.root.end()
+        self._result = metrics
+        collector.observe(metrics)
+        log_metrics({**metrics, **attributes})
+        return metrics
+
+    def fail(self, error: BaseException) -> Dict:
+        """실패한 요청: 루트 span에 예외/ERROR 상태를 남기고 "error"와 함께 지표 기록"""
+        if self._result is None:
+            _record_error(self.root, error)
+        return self.finish(error=repr(error))
+
+
+def _record_error(span, error: BaseException):
+    from opentelemetry.trace import Status, StatusCode
+
+    span.record_exception(error)
+    span.set_status(Status(StatusCode.ERROR, f"{type(error).__name__}: {error}"))
+
+
+@contextmanager
+def optional_stage(metrics: Optional[QAMetrics], name: str, **attributes):
+    if metrics is None:
+        yield None
+    else:
+        with metrics.stage(name, **attributes) as span:
+            yield span
+
+
+# ✅ 프로세스 내 지표 수집기 (최근 METRICS_WINDOW개 요청 기준 분위수)
+class MetricsCollector:
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, metrics: Dict):
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters[f"cache_{metrics['cache'] or 'disabled'}"] += 1
+            if metrics.get("error"):
+                self._counters["errors"] += 1
+            if metrics.get("speculative"):
+                self._counters[f"speculative_{metrics['speculative']}"] += 1
+            for name, value in metrics["tokens"].items():
+                self._counters[f"tokens_{name}"] += value
+            for stage, ms in metrics["timings_ms"].items():
+                self._samples[stage].append(ms)
+            self._samples["context_tokens"].append(metrics["context"]["tokens"])
+            if metrics.get("compression"):
+                self._counters["tokens_context_saved"] += metrics["compression"]["tokens_saved"]
+                self._samples["prompt_context_tokens"].append(metrics["compression"]["tokens_after"])
+
+    def snapshot(self) -> Dict:
+        import numpy as np
+
+        with self._lock:
+            samples = {name: np.array(values) for name, values in self._samples.items() if values}
+            counters = dict(self._counters)
+        return {
+            "counters": counters,
+            "distributions": {
+                name: {
+                    "p50": round(float(np.percentile(values, 50)), 2),
+                    "p95": round(float(np.percentile(values, 95)), 2),
+                    "mean": round(float(values.mean()), 2),
+                    "n": int(len(values))
+                }
+                for name, values in samples.items()
+            }
+        }
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counters.clear()
+
+
+collector = MetricsCollector()
+
+
+# ✅ JSON 로그 (RAG_METRICS_LOG가 비어 있으면 기록하지 않음)
+logger = logging.getLogger("rag.metrics")
+
+
+def _configure_logger():
+    if not METRICS_LOG or logger.handlers:
+        return
+    handler = logging.StreamHandler() if METRICS_LOG == "-" else logging.FileHandler(METRICS_LOG, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+_configure_logger()
+
+
+def log_metrics(metrics: Dict):
+    if METRICS_LOG:
+        logger.info(json.dumps({"event": "rag.qa", "ts": time.time(), **metrics}, ensure_ascii=False))
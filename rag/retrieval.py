@@ -0,0 +1,73 @@
+# 하이브리드 검색 (BM25 + 벡터)
+# 1.	🔍 같은 질문으로 벡터 검색(Chroma)과 BM25 역색인 검색을 각각 fetch_k개씩 가져옵니다.
+# 2.	🔗 두 순위를 reciprocal rank fusion(RRF)으로 합쳐 부품명/코드가 정확히 일치하는 청크도 놓치지 않습니다.
+# 3.	📦 search_many: 같은 문서로 라우팅된 질문 여러 개의 벡터 검색을 Chroma 쿼리 한 번으로 처리합니다.
+#       	(두 검색 결과는 저장소 id로 합치므로 chunk_id 메타데이터가 없는 예전 인덱스도 그대로 검색)
+
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+RRF_K = 60
+
+
+# ✅ RRF: 순위 목록마다 1 / (rrf_k + 순위)를 더함
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], rrf_k: int = RRF_K) -> Dict[str, float]:
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, 1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+
+class HybridRetriever:
+    """벡터 검색과 BM25 검색 결과를 RRF로 합쳐 상위 k개 Document 반환"""
+
+    def __init__(self, vectordb, bm25_index, fetch_k: int = 30, rrf_k: int = RRF_K):
+        self.vectordb = vectordb
+        self.bm25_index = bm25_index
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+
+    def search(self, query: str, query_vector: List[float], k: int = 10,
+               document: Optional[str] = None, fetch_k: Optional[int] = None) -> List[Document]:
+        return self.search_many([query], [query_vector], k, document, fetch_k)[0]
+
+    def search_many(self, queries: List[str], query_vectors: List[List[float]], k: int = 10,
+                    document: Optional[str] = None, fetch_k: Optional[int] = None) -> List[List[Document]]:
+        """같은 문서 필터를 쓰는 질문 여러 개를 Chroma 쿼리 한 번으로 검색 (배치 QA용)"""
+        if not queries:
+            return []
+        fetch_k = max(fetch_k or self.fetch_k, k)
+        # 메타데이터의 chunk_id 대신 저장소 id로 합침 (BM25 역색인과 같은 키, chunk_id 없는 예전 인덱스도 검색됨)
+        data = self.vectordb._collection.query(
+            query_embeddings=query_vectors, n_results=fetch_k,
+            where={"document": document} if document is not None else None,
+            include=["documents", "metadatas"]
+        )
+        vector_hits = [
+            (ids, [Document(page_content=text, metadata=meta or {}) for text, meta in zip(texts, metas)])
+            for ids, texts, metas in zip(data["ids"], data["documents"], data["metadatas"])
+        ]
+        return self._fuse(list(zip(queries, vector_hits)), k, document, fetch_k)
+
+    def _fuse(self, searches, k: int, document: Optional[str], fetch_k: int) -> List[List[Document]]:
+        by_id = {}
+        top_ids_per_query = []
+        for query, (vector_ids, vector_docs) in searches:
+            by_id.update(zip(vector_ids, vector_docs))
+            lexical_hits = self.bm25_index.search(query, k=fetch_k, document=document)
+            fused = reciprocal_rank_fusion(
+                [vector_ids, [chunk_id for chunk_id, _ in lexical_hits]], self.rrf_k
+            )
+            top_ids_per_query.append(list(fused)[:k])
+
+        # BM25에서만 나온 청크는 Chroma에서 한 번에 가져옴
+        missing = list(dict.fromkeys(chunk_id for top_ids in top_ids_per_query
+                                     for chunk_id in top_ids if chunk_id not in by_id))
+        if missing:
+            data = self.vectordb.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, text, meta in zip(data["ids"], data["documents"], data["metadatas"]):
+                by_id[chunk_id] = Document(page_content=text, metadata=meta)
+        return [[by_id[chunk_id] for chunk_id in top_ids if chunk_id in by_id]
+                for top_ids in top_ids_per_query]
@@ -0,0 +1,225 @@
+# 질문 → (섹션, 문서) 라우팅
+# 1.	🧭 structured: 섹션과 문서 선택을 구조화 출력 LLM 호출 한 번으로 처리합니다.
+# 2.	📐 local: 질문 임베딩을 섹션/문서 중심 벡터(centroid)와 비교해 LLM 호출 없이 고르고,
+#       	신뢰도가 낮을 때만 structured 라우터로 넘깁니다.
+# 3.	🗂 중심 벡터는 인덱싱 시점에 계산해 .npz 파일로 저장합니다.
+
+import os
+import textwrap
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from rag.clients import DATA_DIR
+
+CENTROIDS_PATH = DATA_DIR / "chroma_db" / "ev6_centroids.npz"
+
+ROUTING_MODES = ("chain", "structured", "local")
+
+# ✅ 섹션 + 문서 동시 선택 프롬프트
+route_prompt_text = textwrap.dedent("""
+다음은 전기차 정비 문서의 섹션별 문서 목록입니다:
+
+{catalog}
+
+사용자의 질문: {question}
+
+질문과 가장 관련 있는 섹션 하나와 그 섹션의 문서 하나를 골라주세요. 반드시 목록에 있는 섹션명, 문서명과 정확히 일치시켜야 합니다.
+""")
+
+
+class RouteDecision(BaseModel):
+    section: str = Field(description="목록에 있는 섹션명")
+    document: str = Field(description="선택한 섹션에 속한 문서명")
+
+
+def format_catalog(sections: Dict[str, List[str]]) -> str:
+    blocks = []
+    for section, documents in sections.items():
+        lines = [f"[{section}]"] + [f"- {doc}" for doc in documents]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+# ✅ LLM이 목록과 조금 다르게 답해도 카탈로그 기준으로 보정
+def resolve_route(section: str, document: str, sections: Dict[str, List[str]]) -> Dict:
+    section = section.strip().lower()
+    document = document.strip()
+    if document in sections.get(section, []):
+        return {"section": section, "document": document}
+    for candidate, documents in sections.items():
+        if document in documents:
+            return {"section": candidate, "document": document}
+    return {"section": section, "document": document}
+
+
+class StructuredRouter:
+    """섹션과 문서를 구조화 출력 LLM 호출 한 번으로 고르는 라우터"""
+
+    def __init__(self, llm, catalog):
+        from langchain.prompts import PromptTemplate
+
+        self.catalog = catalog
+        self.chain = PromptTemplate.from_template(route_prompt_text) | \
+            llm.with_structured_output(RouteDecision)
+
+    def route(self, query: str, config: Optional[Dict] = None) -> Dict:
+        sections = self.catalog.sections()
+        decision = self.chain.invoke({"catalog": format_catalog(sections), "question": query}, config=config)
+        route = resolve_route(decision.section, decision.document, sections)
+        return {**route, "mode": "structured", "score": None}
+
+    async def aroute(self, query: str, config: Optional[Dict] = None) -> Dict:
+        sections = self.catalog.sections()
+        decision = await self.chain.ainvoke({"catalog": format_catalog(sections), "question": query},
+                                            config=config)
+        route = resolve_route(decision.section, decision.document, sections)
+        return {**route, "mode": "structured", "score": None}
+
+
+# ✅ 중심 벡터 계산 (문서 = 청크 임베딩 평균, 섹션 = 문서 중심 벡터 평균)
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_centroids(embeddings, metadatas: List[Dict]) -> Dict[str, np.ndarray]:
+    by_document = defaultdict(list)
+    for vector, meta in zip(embeddings, metadatas):
+        if meta and meta.get("section") and meta.get("document"):
+            by_document[(meta["section"], meta["document"])].append(vector)
+
+    keys = sorted(by_document)
+    doc_vectors = _normalize(np.stack([
+        _normalize(np.asarray(by_document[key], dtype=np.float32)).mean(axis=0)
+        for key in keys
+    ])) if keys else np.zeros((0, 0), dtype=np.float32)
+
+    by_section = defaultdict(list)
+    for i, (section, _) in enumerate(keys):
+        by_section[section].append(i)
+    section_names = sorted(by_section)
+    section_vectors = _normalize(np.stack([
+        doc_vectors[by_section[section]].mean(axis=0) for section in section_names
+    ])) if section_names else np.zeros((0, 0), dtype=np.float32)
+
+    return {
+        "doc_vectors": doc_vectors.astype(np.float32),
+        "doc_sections": np.array([section for section, _ in keys]),
+        "doc_names": np.array([document for _, document in keys]),
+        "section_vectors": section_vectors.astype(np.float32),
+        "section_names": np.array(section_names),
+    }
+
+
+def save_centroids(centroids: Dict[str, np.ndarray], collection_count: int,
+                   path: Path = CENTROIDS_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp_path, collection_count=np.array(collection_count), **centroids)
+    os.replace(tmp_path, path)
+
+
+def compute_and_save_centroids(vectordb, path: Path = CENTROIDS_PATH) -> Dict[str, np.ndarray]:
+    data = vectordb.get(include=["embeddings", "metadatas"])
+    centroids = build_centroids(data["embeddings"], data["metadatas"])
+    save_centroids(centroids, len(data["metadatas"]), path)
+    return centroids
+
+
+class LocalRouter:
+    """질문 임베딩과 중심 벡터의 코사인 유사도로 라우팅하고, 애매하면 fallback 라우터 사용"""
+
+    def __init__(self, vectordb, embedding_model, fallback=None,
+                 path: Path = CENTROIDS_PATH, min_score: float = 0.3, min_margin: float = 0.02):
+        self.vectordb = vectordb
+        self.embedding_model = embedding_model
+        self.fallback = fallback
+        self.path = path
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self._centroids: Optional[Dict[str, np.ndarray]] = None
+        self._collection_count = -1
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, np.ndarray]:
+        count = self.vectordb._collection.count()
+        mtime = self.path.stat().st_mtime if self.path.exists() else None
+        if self._centroids is not None and count == self._collection_count and mtime == self._mtime:
+            return self._centroids
+
+        with self._lock:
+            centroids = None
+            if self.path.exists():
+                with np.load(self.path) as data:
+                    if int(data["collection_count"]) == count:
+                        centroids = {key: data[key] for key in data.files
+                                     if key != "collection_count"}
+            if centroids is None:
+                print("🔄 라우팅 중심 벡터 재생성 중...")
+                centroids = compute_and_save_centroids(self.vectordb, self.path)
+                mtime = self.path.stat().st_mtime
+            self._centroids = centroids
+            self._collection_count = count
+            self._mtime = mtime
+        return centroids
+
+    @staticmethod
+    def _best(scores: np.ndarray):
+        order = np.argsort(scores)[::-1]
+        best = int(order[0])
+        margin = float(scores[best] - scores[order[1]]) if len(order) > 1 else float(scores[best])
+        return best, float(scores[best]), margin
+
+    def route(self, query: str, query_vector: Optional[List[float]] = None,
+              config: Optional[Dict] = None) -> Dict:
+        if query_vector is None:
+            query_vector = self.embedding_model.embed_query(query)
+        route = self._match(query_vector)
+        if route["mode"] == "local":
+            return route
+        if self.fallback is None:
+            raise RuntimeError("로컬 라우팅 신뢰도가 낮고 fallback 라우터가 없습니다.")
+        fallback = self.fallback.route(query, config=config)
+        return {**fallback, "mode": f"local→{fallback['mode']}", "score": route["score"]}
+
+    async def aroute(self, query: str, query_vector: Optional[List[float]] = None,
+                     config: Optional[Dict] = None) -> Dict:
+        if query_vector is None:
+            query_vector = await self.embedding_model.aembed_query(query)
+        route = self._match(query_vector)
+        if route["mode"] == "local":
+            return route
+        if self.fallback is None:
+            raise RuntimeError("로컬 라우팅 신뢰도가 낮고 fallback 라우터가 없습니다.")
+        fallback = await self.fallback.aroute(query, config=config)
+        return {**fallback, "mode": f"local→{fallback['mode']}", "score": route["score"]}
+
+    def _match(self, query_vector: List[float]) -> Dict:
+        """중심 벡터와 비교해 신뢰도가 충분하면 mode="local", 아니면 mode="low_confidence" 반환"""
+        centroids = self._load()
+        if len(centroids["section_names"]) == 0:
+            return {"section": None, "document": None, "mode": "low_confidence", "score": None}
+
+        q = _normalize(np.asarray(query_vector, dtype=np.float32))
+
+        # 1. 섹션 선택
+        section_idx, section_score, section_margin = self._best(centroids["section_vectors"] @ q)
+        section = str(centroids["section_names"][section_idx])
+
+        # 2. 섹션 내 문서 선택
+        in_section = np.flatnonzero(centroids["doc_sections"] == section)
+        doc_idx, doc_score, doc_margin = self._best(centroids["doc_vectors"][in_section] @ q)
+        document = str(centroids["doc_names"][in_section[doc_idx]])
+
+        confident = (
+            min(section_score, doc_score) >= self.min_score
+            and min(section_margin, doc_margin) >= self.min_margin
+        )
+        mode = "local" if confident else "low_confidence"
+        return {"section": section, "document": document, "mode": mode, "score": doc_score}
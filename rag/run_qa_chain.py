@@ -3,44 +3,18 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import textwrap
-from pathlib import Path
-from dotenv import load_dotenv
-
-from langchain_community.vectorstores import Chroma
-from langchain_openai import AzureOpenAIEmbeddings, ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain.chains import LLMChain
-
-load_dotenv()
-
-# ✅ 경로 설정
-BASE_DIR = Path(__file__).resolve().parent.parent
-CHROMA_DIR = BASE_DIR / "data" / "chroma_db" / "ev6"
-
-# ✅ 임베딩 모델
-embedding_model = AzureOpenAIEmbeddings(
-    azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_API_BASE"),
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
-
-# ✅ LLM 모델
-local_llm = ChatOpenAI(
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-    temperature=0.2,
-    model_name="gpt-4o"
-)
-
-# ✅ Chroma 벡터 DB
-vectordb = Chroma(
-    persist_directory=str(CHROMA_DIR),
-    embedding_function=embedding_model
-)
+import time
+
+# 무거운 라이브러리(langchain, chromadb)는 처음 필요할 때 import (모듈 import는 가볍게 유지)
+# asyncio도 비동기 함수 안에서 import (이벤트 루프 안에서만 호출되므로 이미 로드돼 있음)
+from rag.catalog import SectionCatalog
+from rag.context import assemble_context
+from rag.clients import singleton, get_embedding_model, get_llm, get_vectordb
+from rag.manifest import index_version
+from rag.metrics import QAMetrics, optional_stage
 
 # ✅ 응답 생성 프롬프트 템플릿
-qa_prompt = PromptTemplate.from_template(textwrap.dedent("""
+QA_PROMPT_TEXT = textwrap.dedent("""
     당신은 전기차 정비 문서에 기반하여 질문에 답하는 전문 정비사입니다.
 
     - 문서에서 유사하거나 관련 있는 내용을 참고하여 단계별로 설명하세요.
@@ -54,10 +28,10 @@ qa_prompt = PromptTemplate.from_template(textwrap.dedent("""
     {question}
 
     [정비사 답변]
-"""))
+""")
 
 # ✅ 섹션 분류 프롬프트
-section_prompt = PromptTemplate.from_template(textwrap.dedent("""
+SECTION_PROMPT_TEXT = textwrap.dedent("""
 다음 사용자의 질문이 어느 전기차 정비 시스템 섹션에 가장 관련 있는지 아래 선택지 중 하나만 골라주세요.
 
 선택지:
@@ -78,10 +52,10 @@ section_prompt = PromptTemplate.from_template(textwrap.dedent("""
 질문: {question}
 
 가장 관련 있는 섹션:
-"""))
+""")
 
 # ✅ 문서 추론 프롬프트
-document_prompt = PromptTemplate.from_template(textwrap.dedent("""
+DOCUMENT_PROMPT_TEXT = textwrap.dedent("""
 다음은 "{section}" 섹션의 문서 목록입니다:
 
 {document_list}
@@ -91,63 +65,485 @@ document_prompt = PromptTemplate.from_template(textwrap.dedent("""
 위 문서 중에서 가장 관련 있는 문서명을 정확히 골라주세요. 반드시 목록에 있는 문서명과 일치시켜 출력하세요.
 
 선택한 문서명:
-"""))
+""")
+
+ROUTING_MODE = os.getenv("RAG_ROUTING_MODE", "chain")
+# hybrid: BM25 + 벡터 검색 RRF 결합 / vector: 벡터 검색만
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+# 1이면 라우팅(LLM 호출)과 동시에 문서 필터 없는 검색을 미리 돌리고, 라우팅된 문서의 청크만 골라 씀
+SPECULATIVE_RETRIEVAL = os.getenv("RAG_SPECULATIVE_RETRIEVAL", "0") == "1"
+# 미리 검색한 후보 중 라우팅된 문서의 청크가 k개(문서 청크가 k개보다 적으면 전부)보다 적으면 문서 필터 검색을 다시 함
+SPECULATIVE_K = int(os.getenv("RAG_SPECULATIVE_K", "50"))
+
+
+# ✅ 섹션 → 문서 카탈로그 (프로세스당 한 번 로드)
+@singleton
+def get_section_catalog():
+    return SectionCatalog(get_vectordb())
+
+
+@singleton
+def get_qa_prompt():
+    from langchain.prompts import PromptTemplate
+    return PromptTemplate.from_template(QA_PROMPT_TEXT)
+
+
+@singleton
+def get_routing_chains():
+    from langchain.prompts import PromptTemplate
+    from langchain.chains import LLMChain
+
+    section_chain = LLMChain(llm=get_llm(), prompt=PromptTemplate.from_template(SECTION_PROMPT_TEXT))
+    document_chain = LLMChain(llm=get_llm(), prompt=PromptTemplate.from_template(DOCUMENT_PROMPT_TEXT))
+    return section_chain, document_chain
+
+
+# ✅ 라우터 (chain: 기존 2단계 호출 / structured: 1회 호출 / local: 임베딩 중심 벡터)
+@singleton
+def get_structured_router():
+    from rag.router import StructuredRouter
+    return StructuredRouter(get_llm(), get_section_catalog())
+
+
+@singleton
+def get_local_router():
+    from rag.router import LocalRouter
+    return LocalRouter(get_vectordb(), get_embedding_model(), fallback=get_structured_router())
+
+
+# ✅ 하이브리드 검색기 (BM25 역색인은 인덱싱 때 저장된 파일을 한 번만 로드)
+@singleton
+def get_hybrid_retriever():
+    from rag.bm25 import BM25Index
+    from rag.retrieval import HybridRetriever
+    return HybridRetriever(get_vectordb(), BM25Index(get_vectordb()))
+
+
+# ✅ 청크 → 이미지 경로 테이블 (인덱싱 때 저장된 SQLite, 검색 결과마다 한 번에 조회)
+@singleton
+def get_image_table():
+    from rag.image_table import ImageTable
+    return ImageTable()
+
+
+# ✅ 라우팅과 동시에 도는 미리 검색(speculative retrieval)용 스레드 풀
+@singleton
+def get_speculative_executor():
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=int(os.getenv("RAG_SPECULATIVE_WORKERS", "8")),
+                              thread_name_prefix="rag-speculative")
+
+
+# ✅ 반복 질문용 답변 캐시 (벡터 DB가 다시 만들어지면 자동으로 비움)
+@singleton
+def get_answer_cache():
+    from rag.answer_cache import AnswerCache
+    return AnswerCache()
+
+
+# ✅ 미리 초기화 (Streamlit의 st.cache_resource 등에서 프로세스당 한 번 호출)
+def warm_up(routing_mode: str = None):
+    routing_mode = routing_mode or ROUTING_MODE
+    get_vectordb()
+    get_section_catalog().sections()
+    get_qa_prompt()
+    get_answer_cache()
+    get_image_table()
+    if RETRIEVAL_MODE == "hybrid":
+        get_hybrid_retriever().bm25_index.search("")  # 역색인 미리 로드
+    if routing_mode == "chain":
+        get_routing_chains()
+    else:
+        get_structured_router()
+    if routing_mode == "local":
+        get_local_router()
+
+
+# ✅ 예전 모듈 속성 이름 호환 (접근할 때 생성)
+_LAZY_ATTRIBUTES = {
+    "embedding_model": get_embedding_model,
+    "local_llm": get_llm,
+    "vectordb": get_vectordb,
+    "section_catalog": get_section_catalog,
+    "answer_cache": get_answer_cache,
+}
 
-section_chain = LLMChain(llm=local_llm, prompt=section_prompt)
-document_chain = LLMChain(llm=local_llm, prompt=document_prompt)
 
-# ✅ 커스텀 QA 실행 함수
-def run_custom_qa(query: str):
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def route_with_chains(query: str, metrics: QAMetrics = None):
+    section_chain, document_chain = get_routing_chains()
+    callbacks = metrics.callbacks if metrics else None
+
     # 1. 섹션 추론
-    section = section_chain.run({"question": query}).strip()
+    with optional_stage(metrics, "section_routing"):
+        section = section_chain.run({"question": query}, callbacks=callbacks).strip()
 
-    # 2. 섹션 내 문서 후보 수집
-    all_metadata = vectordb.get()["metadatas"]
-    section_docs = {meta["document"]
-                    for meta in all_metadata if meta.get("section") == section}
-    document_list_str = "\n".join(sorted(section_docs))
+    # 2. 섹션 내 문서 후보 수집 (카탈로그가 낡았으면 여기서 vectordb.get()으로 재생성)
+    with optional_stage(metrics, "catalog"):
+        document_list_str = "\n".join(get_section_catalog().documents(section))
 
     # 3. 문서 추론
-    document = document_chain.run({
-        "question": query,
-        "section": section,
-        "document_list": document_list_str
-    }).strip()
-
-    # 4. 관련 문서 검색 (문서 필터만 사용)
-    retriever = vectordb.as_retriever(
-        search_kwargs={"k": 10, "filter": {"document": document}}
-    )
-    query_with_doc = f"{query} 관련 문서: {document}"
-    docs = retriever.invoke(query_with_doc)
+    with optional_stage(metrics, "document_routing"):
+        document = document_chain.run({
+            "question": query,
+            "section": section,
+            "document_list": document_list_str
+        }, callbacks=callbacks).strip()
+    return {"section": section, "document": document, "mode": "chain", "score": None}
 
-    # 5. 문맥 생성 및 답변 생성
-    context = "\n\n".join([doc.page_content for doc in docs])
-    chain = (
-        {"context": lambda _: context, "question": lambda _: query}
-        | qa_prompt
-        | local_llm
-        | StrOutputParser()
+
+async def aroute_with_chains(query: str, metrics: QAMetrics = None):
+    section_chain, document_chain = get_routing_chains()
+    callbacks = metrics.callbacks if metrics else None
+
+    with optional_stage(metrics, "section_routing"):
+        section = (await section_chain.arun({"question": query}, callbacks=callbacks)).strip()
+
+    with optional_stage(metrics, "catalog"):
+        document_list_str = "\n".join(get_section_catalog().documents(section))
+
+    with optional_stage(metrics, "document_routing"):
+        document = (await document_chain.arun({
+            "question": query,
+            "section": section,
+            "document_list": document_list_str
+        }, callbacks=callbacks)).strip()
+    return {"section": section, "document": document, "mode": "chain", "score": None}
+
+
+def _check_routing_mode(routing_mode: str = None):
+    from rag.router import ROUTING_MODES
+
+    routing_mode = routing_mode or ROUTING_MODE
+    if routing_mode not in ROUTING_MODES:
+        raise ValueError(f"지원하지 않는 라우팅 모드: {routing_mode} (선택지: {ROUTING_MODES})")
+    return routing_mode
+
+
+# query_vector: 이미 계산한 질문 임베딩이 있으면 local 라우터가 다시 임베딩하지 않음
+def route_query(query: str, routing_mode: str = None, metrics: QAMetrics = None, query_vector=None):
+    routing_mode = _check_routing_mode(routing_mode)
+    config = {"callbacks": metrics.callbacks} if metrics else None
+    if routing_mode == "structured":
+        return get_structured_router().route(query, config=config)
+    if routing_mode == "local":
+        return get_local_router().route(query, query_vector=query_vector, config=config)
+    return route_with_chains(query, metrics)
+
+
+async def aroute_query(query: str, routing_mode: str = None, metrics: QAMetrics = None, query_vector=None):
+    routing_mode = _check_routing_mode(routing_mode)
+    config = {"callbacks": metrics.callbacks} if metrics else None
+    if routing_mode == "structured":
+        return await get_structured_router().aroute(query, config=config)
+    if routing_mode == "local":
+        return await get_local_router().aroute(query, query_vector=query_vector, config=config)
+    return await aroute_with_chains(query, metrics)
+
+
+# ✅ 라우팅된 문서 안에서 관련 청크 검색 (query_vector는 "질문 + 문서명" 임베딩)
+def search_documents(query: str, document: str, query_vector, k: int = 10):
+    if RETRIEVAL_MODE == "hybrid":
+        return get_hybrid_retriever().search(query, query_vector, k=k, document=document)
+    return get_vectordb().similarity_search_by_vector(query_vector, k=k, filter={"document": document})
+
+
+# ✅ 같은 문서로 라우팅된 질문 여러 개를 한 번에 검색 (배치 QA용, 결과는 질문 순서대로)
+def search_documents_many(queries, document: str, query_vectors, k: int = 10):
+    if RETRIEVAL_MODE == "hybrid":
+        return get_hybrid_retriever().search_many(queries, query_vectors, k=k, document=document)
+    from langchain_core.documents import Document
+
+    data = get_vectordb()._collection.query(
+        query_embeddings=query_vectors, n_results=k, where={"document": document},
+        include=["documents", "metadatas"]
     )
-    answer = chain.invoke({})
+    return [[Document(page_content=text, metadata=meta) for text, meta in zip(texts, metas)]
+            for texts, metas in zip(data["documents"], data["metadatas"])]
+
+
+# ✅ 미리 검색: 라우팅 결과를 모르는 채로 질문만으로 상위 SPECULATIVE_K개 검색 (문서 필터 없음)
+def speculative_search(query: str, query_vector=None, metrics: QAMetrics = None, k: int = SPECULATIVE_K):
+    if query_vector is None:
+        query_vector = get_embedding_model().embed_query(query)
+    start = time.perf_counter()
+    if RETRIEVAL_MODE == "hybrid":
+        docs = get_hybrid_retriever().search(query, query_vector, k=k, fetch_k=k)
+    else:
+        docs = get_vectordb().similarity_search_by_vector(query_vector, k=k)
+    if metrics is not None:
+        metrics.timings["speculative_retrieval"] = round((time.perf_counter() - start) * 1000, 2)
+    return docs
 
-    # 6. 이미지 정보 정리
+
+async def aspeculative_search(query: str, query_vector=None, metrics: QAMetrics = None):
+    if query_vector is None:
+        query_vector = await get_embedding_model().aembed_query(query)
+    import asyncio
+
+    return await asyncio.to_thread(speculative_search, query, query_vector, metrics)
+
+
+def select_speculative(candidates, document: str, k: int = 10):
+    """미리 검색한 후보 중 라우팅된 문서의 청크만 순위대로 (문서 필터 검색과 같은 개수가 안 되면 None → 문서 필터 검색)"""
+    hits = [doc for doc in candidates if doc.metadata.get("document") == document]
+    # 문서 필터 검색이 돌려줄 개수: k개, 청크가 k개보다 적은 문서는 전부 (청크 수는 섹션 카탈로그에서)
+    min_hits = min(k, get_section_catalog().document_size(document))
+    return hits[:k] if hits and len(hits) >= min_hits else None
+
+
+# ✅ 이미지 정보 정리 (검색된 청크들의 이미지를 이미지 테이블에서 한 번에 조회, 겹치는 이미지는 한 번만)
+# 이미지 파일 이름은 내용 해시이므로 표시 이름은 "문서명_page페이지"로 만듦
+def collect_images(docs):
+    chunk_images = get_image_table().lookup(doc.metadata.get("chunk_id") for doc in docs)
     image_paths = []
     image_names = []
     for doc in docs:
         meta = doc.metadata
-        if "image_paths" in meta:
-            image_paths.extend([p.strip()
-                               for p in meta["image_paths"].split(",")])
-        if "image_names" in meta:
-            image_names.extend([n.strip()
-                               for n in meta["image_names"].split(",")])
+        # 이미지 테이블 이전에 만든 인덱스는 메타데이터의 쉼표 문자열 사용
+        paths = chunk_images.get(meta.get("chunk_id")) or [
+            path.strip() for path in meta.get("image_paths", "").split(",")]
+        for path in paths:
+            if path and path not in image_paths:
+                image_paths.append(path)
+                image_names.append(f"{meta.get('document', '')}_page{meta.get('page', '')}")
+    return image_paths, image_names
+
+
+# ✅ 캐시 적중 시 스트리밍 이벤트를 그대로 재생
+def cached_events(cached):
+    yield {"type": "route", "section": cached["section"],
+           "document": cached["document"], "routing": cached["routing"]}
+    yield {"type": "sources", "source_documents": cached["source_documents"],
+           "image_paths": cached["image_paths"], "image_names": cached["image_names"]}
+    yield {"type": "token", "text": cached["result"]}
+    yield {"type": "done", "result": cached}
+
+
+def build_answer_chain(query: str, context: str):
+    from langchain_core.output_parsers import StrOutputParser
+
+    return (
+        {"context": lambda _: context, "question": lambda _: query}
+        | get_qa_prompt()
+        | get_llm()
+        | StrOutputParser()
+    )
+
 
+def build_result(answer: str, route, docs, image_paths, image_names):
     return {
         "result": answer,
-        "section": section,
-        "document": document,
+        "section": route["section"],
+        "document": route["document"],
+        "routing": route["mode"],
         "source_documents": docs,
         "image_paths": image_paths,
         "image_names": image_names
-    }
\ No newline at end of file
+    }
+
+
+# ✅ 스트리밍 QA 실행 함수
+# 라우팅 결과 → 참고 문서/이미지 → 답변 토큰 → 최종 결과 순서로 이벤트(dict)를 yield
+# 각 단계는 OpenTelemetry span + 지표(rag.metrics)로 계측되고, 최종 결과의 "metrics"에 담김
+# 중간에 예외가 나거나 소비자가 스트림을 닫아도 루트 span을 닫고 "error"와 함께 지표를 기록
+def stream_custom_qa(query: str, routing_mode: str = None, use_cache: bool = True):
+    routing_mode = routing_mode or ROUTING_MODE
+    metrics = QAMetrics(query, routing_mode)
+    try:
+        yield from _stream_custom_qa(query, routing_mode, use_cache, metrics)
+    except BaseException as error:
+        metrics.fail(error)
+        raise
+
+
+def _stream_custom_qa(query: str, routing_mode: str, use_cache: bool, metrics: QAMetrics):
+    vectordb = get_vectordb()
+    embedding_model = get_embedding_model()
+    answer_cache = get_answer_cache()
+
+    # 0. 답변 캐시 조회 (정확 일치 → 유사 질문, 질문 임베딩은 필요할 때만 계산)
+    query_vector = []
+    if use_cache:
+        with metrics.stage("cache_lookup"):
+            version = index_version(vectordb)
+
+            def embed_query():
+                query_vector.append(embedding_model.embed_query(query))
+                return query_vector[0]
+
+            cached = answer_cache.get(query, routing_mode, version, embed=embed_query)
+        metrics.cache = cached["cache"] if cached is not None else "miss"
+        if cached is not None:
+            metrics.set_context(cached["source_documents"])
+            yield from cached_events({**cached, "metrics": metrics.finish()})
+            return
+
+    # 1~3. 섹션/문서 라우팅 (SPECULATIVE_RETRIEVAL이면 LLM 호출을 기다리는 동안 필터 없는 검색을 미리 실행)
+    speculative = None
+    if SPECULATIVE_RETRIEVAL:
+        if routing_mode == "local" and not query_vector:
+            query_vector.append(embedding_model.embed_query(query))  # local 라우터와 같이 씀
+        speculative = get_speculative_executor().submit(
+            speculative_search, query, query_vector[0] if query_vector else None, metrics)
+    with metrics.stage("routing", **{"rag.routing_mode": routing_mode}):
+        route = route_query(query, routing_mode, metrics, query_vector[0] if query_vector else None)
+    section = route["section"]
+    document = route["document"]
+    yield {"type": "route", "section": section, "document": document, "routing": route["mode"]}
+
+    # 4. 관련 문서 검색 (문서 필터만 사용, 기본은 BM25 + 벡터 하이브리드)
+    # 미리 검색한 후보에 라우팅된 문서의 청크가 충분하면 그대로 쓰고, 아니면 문서 필터 검색
+    with metrics.stage("retrieval", **{"rag.retrieval_mode": RETRIEVAL_MODE}) as span:
+        docs = None
+        if speculative is not None:
+            docs = select_speculative(speculative.result(), document)
+            metrics.speculative = "hit" if docs is not None else "miss"
+            span.set_attribute("rag.speculative", metrics.speculative)
+        if docs is None:
+            query_with_doc = f"{query} 관련 문서: {document}"
+            docs = search_documents(query, document, embedding_model.embed_query(query_with_doc))
+    metrics.set_context(docs)
+
+    # 5. 이미지 정보 정리 후 참고 자료 먼저 전달
+    image_paths, image_names = collect_images(docs)
+    yield {"type": "sources", "source_documents": docs,
+           "image_paths": image_paths, "image_names": image_names}
+
+    # 6. 문맥 조립 (중복 문장 제거, 토큰 예산을 넘으면 질문 관련 문장 위주로 압축)
+    with metrics.stage("context"):
+        context, compression = assemble_context(query, docs)
+    metrics.set_compression(compression)
+
+    # 7. 답변 생성 (토큰 단위 스트리밍)
+    with metrics.stage("generation"):
+        chain = build_answer_chain(query, context)
+        answer_parts = []
+        for token in chain.stream({}, config={"callbacks": metrics.callbacks}):
+            if not answer_parts:
+                metrics.timings["first_token"] = round((time.perf_counter() - metrics.started) * 1000, 2)
+            answer_parts.append(token)
+            yield {"type": "token", "text": token}
+
+    result = build_result("".join(answer_parts), route, docs, image_paths, image_names)
+
+    if use_cache:
+        vector = query_vector[0] if query_vector else embedding_model.embed_query(query)
+        answer_cache.put(query, routing_mode, version, result, vector)
+    yield {"type": "done", "result": {**result, "cache": None, "metrics": metrics.finish()}}
+
+
+# ✅ 커스텀 QA 실행 함수 (스트리밍 결과를 모아 한 번에 반환)
+def run_custom_qa(query: str, routing_mode: str = None, use_cache: bool = True):
+    for event in stream_custom_qa(query, routing_mode, use_cache):
+        if event["type"] == "done":
+            return event["result"]
+
+
+# ✅ 비동기 스트리밍 QA 실행 함수 (FastAPI 서비스용, 이벤트 순서와 계측은 stream_custom_qa와 동일)
+# LLM/임베딩 호출은 비동기 클라이언트로, 로컬 Chroma 검색만 스레드에서 실행
+async def astream_custom_qa(query: str, routing_mode: str = None, use_cache: bool = True):
+    routing_mode = routing_mode or ROUTING_MODE
+    metrics = QAMetrics(query, routing_mode)
+    events = _astream_custom_qa(query, routing_mode, use_cache, metrics)
+    try:
+        async for event in events:
+            yield event
+    except BaseException as error:
+        metrics.fail(error)
+        raise
+    finally:
+        await events.aclose()
+
+
+async def _astream_custom_qa(query: str, routing_mode: str, use_cache: bool, metrics: QAMetrics):
+    import asyncio
+
+    vectordb = get_vectordb()
+    embedding_model = get_embedding_model()
+    answer_cache = get_answer_cache()
+
+    # 0. 답변 캐시 조회
+    query_vector = []
+    if use_cache:
+        with metrics.stage("cache_lookup"):
+            version = index_version(vectordb)
+
+            async def embed_query():
+                query_vector.append(await embedding_model.aembed_query(query))
+                return query_vector[0]
+
+            cached = await answer_cache.aget(query, routing_mode, version, embed=embed_query)
+        metrics.cache = cached["cache"] if cached is not None else "miss"
+        if cached is not None:
+            metrics.set_context(cached["source_documents"])
+            for event in cached_events({**cached, "metrics": metrics.finish()}):
+                yield event
+            return
+
+    # 1~3. 섹션/문서 라우팅 (미리 검색은 별도 태스크로 동시에 실행)
+    speculative = None
+    if SPECULATIVE_RETRIEVAL:
+        if routing_mode == "local" and not query_vector:
+            query_vector.append(await embedding_model.aembed_query(query))
+        speculative = asyncio.create_task(
+            aspeculative_search(query, query_vector[0] if query_vector else None, metrics))
+    try:
+        with metrics.stage("routing", **{"rag.routing_mode": routing_mode}):
+            route = await aroute_query(query, routing_mode, metrics, query_vector[0] if query_vector else None)
+    except BaseException:
+        if speculative is not None:
+            speculative.cancel()
+        raise
+    document = route["document"]
+    yield {"type": "route", "section": route["section"], "document": document, "routing": route["mode"]}
+
+    # 4. 관련 문서 검색 (미리 검색한 후보에 라우팅된 문서의 청크가 충분하면 그대로 사용)
+    with metrics.stage("retrieval", **{"rag.retrieval_mode": RETRIEVAL_MODE}) as span:
+        docs = None
+        if speculative is not None:
+            docs = select_speculative(await speculative, document)
+            metrics.speculative = "hit" if docs is not None else "miss"
+            span.set_attribute("rag.speculative", metrics.speculative)
+        if docs is None:
+            search_vector = await embedding_model.aembed_query(f"{query} 관련 문서: {document}")
+            docs = await asyncio.to_thread(search_documents, query, document, search_vector)
+    metrics.set_context(docs)
+
+    # 5. 이미지 정보 정리 후 참고 자료 먼저 전달
+    image_paths, image_names = collect_images(docs)
+    yield {"type": "sources", "source_documents": docs,
+           "image_paths": image_paths, "image_names": image_names}
+
+    # 6. 문맥 조립 (중복 문장 제거, 토큰 예산을 넘으면 질문 관련 문장 위주로 압축)
+    with metrics.stage("context"):
+        context, compression = assemble_context(query, docs)
+    metrics.set_compression(compression)
+
+    # 7. 답변 생성 (토큰 단위 스트리밍)
+    with metrics.stage("generation"):
+        chain = build_answer_chain(query, context)
+        answer_parts = []
+        async for token in chain.astream({}, config={"callbacks": metrics.callbacks}):
+            if not answer_parts:
+                metrics.timings["first_token"] = round((time.perf_counter() - metrics.started) * 1000, 2)
+            answer_parts.append(token)
+            yield {"type": "token", "text": token}
+
+    result = build_result("".join(answer_parts), route, docs, image_paths, image_names)
+
+    if use_cache:
+        vector = query_vector[0] if query_vector else await embedding_model.aembed_query(query)
+        answer_cache.put(query, routing_mode, version, result, vector)
+    yield {"type": "done", "result": {**result, "cache": None, "metrics": metrics.finish()}}
+
+
+async def arun_custom_qa(query: str, routing_mode: str = None, use_cache: bool = True):
+    async for event in astream_custom_qa(query, routing_mode, use_cache):
+        if event["type"] == "done":
+            return event["result"]
\ No newline at end of file
@@ -0,0 +1,51 @@
+# 토큰 수 계산 (tiktoken 사용, 인코딩 파일을 받을 수 없는 환경에서는 근사치)
+# 검색용 토큰화(tokenize: BM25, 문맥 압축, 가짜 임베딩이 같이 씀)도 여기 둠 (numpy 등 무거운 import 없음)
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List
+
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception:
+        # 오프라인 등으로 인코딩을 로드하지 못하면 근사치 사용
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # 한글 1자 ≈ 1토큰, 영문 3~4자 ≈ 1토큰 → UTF-8 바이트 / 3 으로 근사
+    return max(1, len(text.encode("utf-8")) // 3)
+
+
+HANGUL_RE = re.compile(r"[가-힣]+")
+ALNUM_RE = re.compile(r"[0-9a-z]+(?:[-_./][0-9a-z]+)*")
+ALNUM_PART_RE = re.compile(r"[0-9a-z]+")
+
+
+# ✅ 검색용 토큰화: 한국어는 한글 음절 바이그램, 영문/숫자는 부품명·코드(예: "A-123", "12v") 단위
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFC", text).lower()
+    tokens = []
+    for word in HANGUL_RE.findall(text):
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    for code in ALNUM_RE.findall(text):
+        tokens.append(code)
+        parts = ALNUM_PART_RE.findall(code)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
@@ -0,0 +1,263 @@
+# 읽기 전용 질의 노드용 벡터 번들 (Chroma 없이 memory-map으로 검색)
+# 1.	📦 store_to_vectordb가 Chroma 컬렉션을 번들 폴더로 내보냅니다.
+#       	vectors.npy(int8 + 행별 scale, 또는 float16) + metadata.arrow(청크 id/본문/메타데이터, 비압축 Arrow IPC) + bundle.json
+# 2.	🗺 행은 문서명 순으로 정렬해 저장하므로 문서 필터 검색은 연속된 행 구간만 읽습니다.
+# 3.	⚡ VectorBundle은 두 파일을 memory-map으로 열고 (로드 시간 ~0, 워커끼리 OS 페이지 캐시 공유)
+#       	정규화된 벡터의 내적을 블록 단위 numpy 행렬곱으로 계산하는 정확(exact) 검색을 합니다.
+# 4.	🔌 질의 경로가 쓰는 Chroma API(similarity_search_by_vector, get, _collection.count/query)만 흉내 내므로
+#       	RAG_VECTOR_BACKEND=bundle 이면 get_vectordb()가 이 클래스를 돌려주고 나머지 코드는 그대로 동작합니다.
+
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from rag.clients import DATA_DIR
+
+BUNDLE_DIR = DATA_DIR / "chroma_db" / "ev6_bundle"
+BUNDLE_DTYPES = ("int8", "float16")
+BUNDLE_FORMAT = 1
+
+# 한 번에 float32로 바꿔 계산할 행 수 (검색 중 임시 메모리 상한: BLOCK_ROWS x 차원 x 4바이트)
+BLOCK_ROWS = int(os.getenv("RAG_BUNDLE_BLOCK_ROWS", "4096"))
+
+# Arrow 파일의 내부 열 (나머지 열은 모두 Chroma 메타데이터)
+ID_COLUMN = "_id"
+TEXT_COLUMN = "_text"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# ✅ 양자화: int8은 행마다 최댓값 기준 대칭 scale (벡터 ≈ q * scale), float16은 그대로 변환
+def quantize(vectors: np.ndarray, dtype: str = "int8"):
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype != "int8":
+        raise ValueError(f"지원하지 않는 번들 dtype: {dtype} (선택지: {BUNDLE_DTYPES})")
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0)
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales
+
+
+# ✅ 내보내기 (임시 폴더에 다 쓴 뒤 교체하므로 읽는 쪽은 항상 완전한 번들만 봄)
+def export_bundle(vectordb, path: Path = BUNDLE_DIR, dtype: str = "int8") -> Dict:
+    import pyarrow as pa
+
+    data = vectordb.get(include=["embeddings", "documents", "metadatas"])
+    ids = list(data["ids"])
+    metadatas = [meta or {} for meta in data["metadatas"]]
+    # 문서명 → 원래 순서로 정렬해 문서별 행 구간을 만듦
+    order = sorted(range(len(ids)), key=lambda i: (str(metadatas[i].get("document", "")), i))
+    vectors = np.asarray(data["embeddings"], dtype=np.float32).reshape(len(ids), -1)[order]
+    quantized, scales = quantize(_normalize(vectors), dtype)
+
+    columns = {
+        ID_COLUMN: pa.array([ids[i] for i in order], pa.string()),
+        TEXT_COLUMN: pa.array([data["documents"][i] or "" for i in order], pa.string()),
+    }
+    for key in dict.fromkeys(key for meta in metadatas for key in meta):
+        columns[key] = pa.array([metadatas[i].get(key) for i in order])
+    table = pa.table(columns)
+
+    documents: Dict[str, List[int]] = {}
+    for row, i in enumerate(order):
+        name = str(metadatas[i].get("document", ""))
+        documents.setdefault(name, [row, row])[1] = row + 1
+
+    info = {
+        "format": BUNDLE_FORMAT,
+        "dtype": dtype,
+        "count": len(ids),
+        "dim": int(vectors.shape[1]) if len(ids) else 0,
+        "collection_count": vectordb._collection.count(),
+        "documents": documents,
+    }
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    np.save(tmp_path / "vectors.npy", quantized)
+    if scales is not None:
+        np.save(tmp_path / "scales.npy", scales)
+    with pa.OSFile(str(tmp_path / "metadata.arrow"), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    with open(tmp_path / "bundle.json", "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False)
+
+    # 폴더는 os.replace로 덮어쓸 수 없으므로 옛 번들을 옆으로 옮긴 뒤 교체
+    # (이미 열려 있는 memory-map은 지워진 파일을 계속 가리키므로 안전)
+    old_path = path.with_name(path.name + ".old")
+    shutil.rmtree(old_path, ignore_errors=True)
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    info["bytes"] = sum(f.stat().st_size for f in path.iterdir())
+    return info
+
+
+class VectorBundle:
+    """내보낸 번들을 memory-map으로 열어 검색하는 읽기 전용 벡터 DB (bundle.json이 바뀌면 다시 엶)"""
+
+    def __init__(self, path: Path = BUNDLE_DIR, embedding_function=None, block_rows: int = BLOCK_ROWS):
+        self.path = path
+        self.embedding_function = embedding_function
+        self.block_rows = block_rows
+        # Chroma 컬렉션 API(count/query)도 이 객체가 직접 제공
+        self._collection = self
+        self._bundle: Optional[Dict] = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict:
+        info_path = self.path / "bundle.json"
+        if not info_path.exists():
+            raise FileNotFoundError(f"벡터 번들이 없습니다: {self.path} (python scripts/store_to_vectordb.py로 생성)")
+        mtime = info_path.stat().st_mtime_ns
+        if self._bundle is not None and mtime == self._mtime:
+            return self._bundle
+
+        import pyarrow as pa
+
+        with self._lock:
+            if self._bundle is None or mtime != self._mtime:
+                with open(info_path, "r", encoding="utf-8") as f:
+                    info = json.load(f)
+                scales_path = self.path / "scales.npy"
+                self._bundle = {
+                    **info,
+                    "vectors": np.load(self.path / "vectors.npy", mmap_mode="r"),
+                    "scales": np.load(scales_path, mmap_mode="r") if info["dtype"] == "int8" else None,
+                    # 비압축 Arrow IPC는 memory-map 위에서 복사 없이 읽힘
+                    "table": pa.ipc.open_file(pa.memory_map(str(self.path / "metadata.arrow"))).read_all(),
+                }
+                self._mtime = mtime
+        return self._bundle
+
+    # ✅ 점수 계산 (정규화된 벡터의 내적 = 코사인 유사도)
+    def _scores(self, bundle: Dict, query_vectors: np.ndarray, rows: Optional[np.ndarray],
+                start: int, end: int) -> np.ndarray:
+        vectors, scales = bundle["vectors"], bundle["scales"]
+        if rows is not None:
+            block = vectors[rows].astype(np.float32)
+            return block @ query_vectors.T * (scales[rows, None] if scales is not None else 1.0)
+        scores = np.empty((end - start, len(query_vectors)), dtype=np.float32)
+        # 블록을 캐시에 들어가는 크기의 float32 버퍼 하나에 바꿔 담으며 계산 (블록마다 새로 할당하지 않음)
+        buffer = np.empty((min(self.block_rows, end - start), bundle["dim"]), dtype=np.float32)
+        for i in range(start, end, self.block_rows):
+            j = min(i + self.block_rows, end)
+            block = buffer[:j - i]
+            np.copyto(block, vectors[i:j], casting="unsafe")
+            np.matmul(block, query_vectors.T, out=scores[i - start:j - start])
+            if scales is not None:
+                scores[i - start:j - start] *= scales[i:j, None]
+        return scores
+
+    def _filter_rows(self, bundle: Dict, where: Optional[Dict]):
+        """(행 구간 start, end, 구간 안 행 번호 배열 또는 None) — 문서 필터는 연속 구간으로 처리"""
+        where = dict(where or {})
+        start, end = 0, bundle["count"]
+        document = where.pop("document", None)
+        if document is not None:
+            start, end = bundle["documents"].get(document, (0, 0))
+        if not where:
+            return start, end, None
+
+        import pyarrow.compute as pc
+
+        table = bundle["table"].slice(start, end - start)
+        mask = None
+        for key, value in where.items():
+            if key.startswith("$") or isinstance(value, dict) or key not in table.column_names:
+                raise ValueError(f"벡터 번들은 메타데이터 값 일치 필터만 지원합니다: {key}")
+            matched = pc.equal(table[key], value)
+            mask = matched if mask is None else pc.and_(mask, matched)
+        rows = np.flatnonzero(mask.to_numpy(zero_copy_only=False)) + start
+        return start, end, rows
+
+    def _rows_to_documents(self, bundle: Dict, rows: Sequence[int]):
+        from langchain_core.documents import Document
+
+        records = bundle["table"].take(np.asarray(rows, dtype=np.int64)).to_pylist()
+        return [Document(page_content=record.pop(TEXT_COLUMN),
+                         metadata={key: value for key, value in record.items()
+                                   if key != ID_COLUMN and value is not None})
+                for record in records]
+
+    def _search(self, query_vectors, k: int, where: Optional[Dict]):
+        """질문별 (행 번호, 유사도) 목록, 유사도 내림차순"""
+        bundle = self._load()
+        query_vectors = _normalize(np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1))
+        start, end, rows = self._filter_rows(bundle, where)
+        candidates = np.arange(start, end) if rows is None else rows
+        if len(candidates) == 0 or len(query_vectors) == 0:
+            return [([], []) for _ in range(len(query_vectors))]
+        scores = self._scores(bundle, query_vectors, rows, start, end)
+        k = min(k, len(candidates))
+        results = []
+        for column in scores.T:
+            top = np.argpartition(-column, k - 1)[:k] if k < len(column) else np.arange(len(column))
+            top = top[np.argsort(-column[top], kind="stable")]
+            results.append((candidates[top], column[top]))
+        return results
+
+    # ✅ Chroma 호환 API
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict] = None, **kwargs):
+        rows, _ = self._search([embedding], k, filter)[0]
+        return self._rows_to_documents(self._load(), rows)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None, **kwargs):
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k, filter)
+
+    def count(self) -> int:
+        return self._load()["count"]
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None,
+              include: Sequence[str] = ("documents", "metadatas", "distances"), **kwargs) -> Dict:
+        """chromadb Collection.query와 같은 모양 (distances는 단위 벡터 간 제곱 L2 거리)"""
+        bundle = self._load()
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for rows, scores in self._search(query_embeddings, n_results, where):
+            docs = self._rows_to_documents(bundle, rows)
+            result["ids"].append(bundle["table"][ID_COLUMN].take(np.asarray(rows, dtype=np.int64)).to_pylist())
+            result["documents"].append([doc.page_content for doc in docs])
+            result["metadatas"].append([doc.metadata for doc in docs])
+            result["distances"].append([float(2 - 2 * score) for score in scores])
+        return {key: value for key, value in result.items() if key == "ids" or key in include}
+
+    def get(self, ids: Optional[Sequence[str]] = None, include: Sequence[str] = ("documents", "metadatas"),
+            **kwargs) -> Dict:
+        """vectordb.get과 같은 모양 (embeddings는 역양자화한 정규화 벡터)"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        bundle = self._load()
+        table = bundle["table"]
+        if ids is None:
+            rows = np.arange(bundle["count"])
+        else:
+            positions = pc.index_in(pa.array(list(ids), pa.string()), value_set=table[ID_COLUMN])
+            rows = np.array([row for row in positions.to_pylist() if row is not None], dtype=np.int64)
+        result = {"ids": table[ID_COLUMN].take(rows).to_pylist()}
+        if "documents" in include or "metadatas" in include:
+            docs = self._rows_to_documents(bundle, rows)
+            if "documents" in include:
+                result["documents"] = [doc.page_content for doc in docs]
+            if "metadatas" in include:
+                result["metadatas"] = [doc.metadata for doc in docs]
+        if "embeddings" in include:
+            vectors = bundle["vectors"][rows].astype(np.float32)
+            if bundle["scales"] is not None:
+                vectors *= bundle["scales"][rows, None]
+            result["embeddings"] = vectors
+        return result
@@ -0,0 +1,52 @@
+# 배치 QA 실행 (JSONL 질문 파일 → JSONL 답변 파일)
+# 1.	📥 한 줄에 {"id": ..., "question": ...} 하나씩 있는 파일을 읽어 rag.batch로 처리합니다.
+# 2.	⚡ 질문 임베딩은 묶음 단위로, 검색은 라우팅된 문서별로 한 번에 하고, LLM 호출은 --concurrency개까지 동시에 보냅니다.
+# 3.	📤 답변은 끝나는 대로 출력 파일에 한 줄씩 덧붙이므로, 중간에 멈춰도 같은 명령으로 다시 실행하면 이어서 처리합니다.
+#
+# 예: python scripts/batch_qa.py questions.jsonl answers.jsonl --routing-mode local --concurrency 16
+#     (API 키 없이 확인: RAG_FAKE_MODELS=1 과 픽스처 인덱스가 있는 RAG_DATA_DIR 사용)
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from rag import run_qa_chain
+from rag.batch import BATCH_CONCURRENCY, BATCH_SIZE, arun_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONL 질문 파일을 한 번에 처리해 JSONL 답변 파일로 저장")
+    parser.add_argument("input", type=Path, help="질문 JSONL ({\"id\": ..., \"question\": ...})")
+    parser.add_argument("output", type=Path, help="답변 JSONL (있으면 이어서 처리)")
+    parser.add_argument("--routing-mode", default=None, help="chain / structured / local (기본: RAG_ROUTING_MODE)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="동시에 보낼 LLM 요청 수")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="한 번에 임베딩/검색할 질문 수")
+    parser.add_argument("--no-cache", action="store_true", help="답변 캐시를 쓰지 않음")
+    parser.add_argument("--restart", action="store_true", help="기존 출력 파일을 지우고 처음부터")
+    args = parser.parse_args()
+
+    if args.restart and args.output.exists():
+        args.output.unlink()
+
+    routing_mode = args.routing_mode or run_qa_chain.ROUTING_MODE
+    run_qa_chain.warm_up(routing_mode)
+    print(f"🚀 배치 QA 시작: {args.input} → {args.output} (라우팅: {routing_mode}, 동시 요청: {args.concurrency})")
+
+    def report(record):
+        if "error" in record:
+            print(f"❌ {record['id']}: {record['error']}")
+        else:
+            print(f"✅ {record['id']}: {record['document']}")
+
+    stats = asyncio.run(arun_batch(args.input, args.output, routing_mode, args.concurrency,
+                                   args.batch_size, not args.no_cache, report))
+    print(f"📊 전체 {stats['total']}개 | 건너뜀 {stats['skipped']} | 답변 {stats['answered']} | "
+          f"캐시 {stats['cached']} | 실패 {stats['errors']} | {stats['seconds']}초")
+
+
+if __name__ == "__main__":
+    main()
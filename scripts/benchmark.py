@@ -0,0 +1,241 @@
+# 검색 품질 / 지연 시간 벤치마크
+# 1.	📋 버전이 붙은 골든 질문 세트(benchmarks/golden_v*.jsonl: 질문 → 기대 섹션/문서/페이지)를 run_custom_qa로 실행합니다.
+# 2.	⏱ 단계별(섹션 라우팅, 문서 라우팅, 검색, 생성) 지연 시간 p50/p95, 토큰 수, 검색 recall@k를 보고합니다.
+#       	(recall@k: 상위 k개 청크 중 기대 문서의 기대 페이지를 포함한 청크가 있는지, pages가 없는 질문은 문서만 비교)
+# 3.	🧪 기본은 오프라인 모드: 임시 폴더에 픽스처 코퍼스(benchmarks/corpus_v*.jsonl)를 적재하고
+#       	rag.fakes의 결정적 모델을 쓰므로 API 키 없이 CI에서 돌릴 수 있습니다.
+#       	(픽스처 문서가 여러 청크로 나뉘도록 --chunk-size / --chunk-overlap 으로 청킹, 기본 200 / 30 토큰)
+# 4.	🚨 --baseline 리포트와 비교해 p95가 느려지거나 정확도/recall이 떨어지면 종료 코드 1로 끝납니다.
+#
+# 예: python scripts/benchmark.py --routing-mode local --output bench.json
+#     python scripts/benchmark.py --baseline bench.json --max-regression 0.25
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = BASE_DIR / "benchmarks"
+GOLDEN_PATH = BENCH_DIR / "golden_v2.jsonl"
+CORPUS_PATH = BENCH_DIR / "corpus_v2.jsonl"
+
+STAGES = ("cache_lookup", "section_routing", "catalog", "document_routing", "routing",
+          "speculative_retrieval", "retrieval", "context", "first_token", "generation", "total")
+RECALL_KS = (1, 3, 5, 10)
+
+
+def load_jsonl(path: Path) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ✅ 오프라인 모드: 픽스처 코퍼스를 RAG_DATA_DIR(임시 폴더)에 적재
+def build_fixture_index(corpus_path: Path):
+    from scripts.store_to_vectordb import (
+        convert_to_documents, store_to_chroma, store_images, store_catalog, store_centroids, store_bm25,
+        store_bundle, CHROMA_DIR
+    )
+
+    chunk_images = {}
+    documents = convert_to_documents(load_jsonl(corpus_path), chunk_images=chunk_images)
+    vectordb = store_to_chroma(documents, CHROMA_DIR)
+    store_images(chunk_images)
+    store_catalog(vectordb)
+    store_centroids(vectordb)
+    store_bm25(vectordb)
+    store_bundle(vectordb)
+
+
+def is_relevant(doc, item: Dict) -> bool:
+    """기대 문서의 청크이고, 기대 페이지(pages)가 있으면 청크 페이지 범위가 그중 하나를 포함"""
+    meta = doc.metadata
+    if meta.get("document") != item["document"]:
+        return False
+    if not item.get("pages"):
+        return True
+    page = meta.get("page", 0)
+    return any(page <= expected <= meta.get("page_end", page) for expected in item["pages"])
+
+
+# ✅ 질문 하나 실행 → 단계별 시간, 라우팅 정답 여부, recall@k, 토큰 수 (result["metrics"] 사용)
+def run_question(item: Dict, routing_mode: str) -> Dict:
+    from rag import run_qa_chain
+
+    result = run_qa_chain.run_custom_qa(item["question"], routing_mode, use_cache=False)
+    metrics = result["metrics"]
+    relevant = [is_relevant(doc, item) for doc in result["source_documents"]]
+    return {
+        "id": item.get("id"),
+        "question": item["question"],
+        "routed_section": result["section"],
+        "routed_document": result["document"],
+        "section_hit": result["section"].strip().lower() == item["section"].strip().lower(),
+        "document_hit": result["document"] == item["document"],
+        "recall": {k: any(relevant[:k]) for k in RECALL_KS},
+        "tokens": {
+            "prompt": metrics["tokens"]["prompt"],
+            "completion": metrics["tokens"]["completion"],
+            "context": metrics["context"]["tokens"],
+            "context_sent": metrics["compression"].get("tokens_after", metrics["context"]["tokens"]),
+            "llm_calls": metrics["tokens"]["llm_calls"]
+        },
+        "speculative": metrics.get("speculative"),
+        "timings_ms": metrics["timings_ms"]
+    }
+
+
+def summarize(records: List[Dict]) -> Dict:
+    latency = {}
+    for stage in STAGES:
+        values = np.array([r["timings_ms"][stage] for r in records if stage in r["timings_ms"]])
+        if len(values):
+            latency[stage] = {
+                "p50": round(float(np.percentile(values, 50)), 2),
+                "p95": round(float(np.percentile(values, 95)), 2),
+                "mean": round(float(values.mean()), 2),
+                "n": int(len(values))
+            }
+    tokens = {
+        name: {
+            "mean": round(float(np.mean([r["tokens"][name] for r in records])), 1),
+            "total": int(sum(r["tokens"][name] for r in records))
+        }
+        for name in ("prompt", "completion", "context", "context_sent", "llm_calls")
+    }
+    quality = {
+        "section_accuracy": round(float(np.mean([r["section_hit"] for r in records])), 4),
+        "document_accuracy": round(float(np.mean([r["document_hit"] for r in records])), 4),
+        **{f"recall@{k}": round(float(np.mean([r["recall"][k] for r in records])), 4) for k in RECALL_KS}
+    }
+    speculative = [r["speculative"] for r in records if r.get("speculative")]
+    summary = {"latency_ms": latency, "tokens": tokens, "quality": quality}
+    if speculative:
+        summary["speculative_hit_rate"] = round(speculative.count("hit") / len(speculative), 4)
+    return summary
+
+
+# ✅ 기준 리포트와 비교 (지연 시간은 비율 + 최소 차이(ms) 둘 다 넘어야 회귀로 판단)
+def compare(report: Dict, baseline: Dict, max_regression: float, min_delta_ms: float) -> List[str]:
+    failures = []
+    for stage, stats in baseline.get("latency_ms", {}).items():
+        current = report["latency_ms"].get(stage)
+        if current is None:
+            continue
+        limit = max(stats["p95"] * (1 + max_regression), stats["p95"] + min_delta_ms)
+        if current["p95"] > limit:
+            failures.append(f"{stage} p95 {current['p95']}ms > 기준 {stats['p95']}ms (허용 {limit:.2f}ms)")
+    for metric, value in baseline.get("quality", {}).items():
+        current = report["quality"].get(metric)
+        if current is not None and current + 1e-9 < value:
+            failures.append(f"{metric} {current} < 기준 {value}")
+    return failures
+
+
+def print_report(report: Dict):
+    print(f"\n📊 벤치마크 결과 (골든 세트 {report['golden']}, 질문 {report['questions']}개 × {report['repeat']}회, "
+          f"라우팅 {report['routing_mode']}, 검색 {report['retrieval_mode']}, 청킹 {report['chunking']}, "
+          f"{'가짜 모델' if report['fake_models'] else '실제 모델'})")
+    print(f"{'단계':<18}{'p50(ms)':>10}{'p95(ms)':>10}{'평균(ms)':>10}")
+    for stage, stats in report["latency_ms"].items():
+        print(f"{stage:<18}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['mean']:>10.2f}")
+    print("🔢 토큰 (평균 / 합계): " + ", ".join(
+        f"{name} {stats['mean']} / {stats['total']}" for name, stats in report["tokens"].items()))
+    print("🎯 품질: " + ", ".join(f"{name} {value}" for name, value in report["quality"].items()))
+    if "speculative_hit_rate" in report:
+        print(f"🔮 미리 검색 적중률: {report['speculative_hit_rate']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="골든 질문 세트로 QA 파이프라인의 지연 시간/검색 품질 측정")
+    parser.add_argument("--golden", type=Path, default=GOLDEN_PATH, help="질문 → 기대 문서 JSONL")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH, help="오프라인 모드에서 적재할 청크 JSONL")
+    parser.add_argument("--routing-mode", default=None, help="chain / structured / local (기본: RAG_ROUTING_MODE)")
+    parser.add_argument("--retrieval-mode", default=None, help="hybrid / vector (기본: RAG_RETRIEVAL_MODE)")
+    parser.add_argument("--vector-backend", default=None, help="chroma / bundle (기본: RAG_VECTOR_BACKEND)")
+    parser.add_argument("--speculative", action="store_true", help="라우팅과 동시에 미리 검색 (RAG_SPECULATIVE_RETRIEVAL=1)")
+    parser.add_argument("--repeat", type=int, default=3, help="질문 세트 반복 횟수")
+    parser.add_argument("--warmup", type=int, default=3, help="측정 전에 버리는 질문 수")
+    parser.add_argument("--live", action="store_true", help="실제 모델과 기존 인덱스(data/) 사용")
+    parser.add_argument("--chunk-size", type=int, default=200, help="오프라인 모드 픽스처 청크 크기 (토큰)")
+    parser.add_argument("--chunk-overlap", type=int, default=30, help="오프라인 모드 픽스처 청크 겹침 (토큰)")
+    parser.add_argument("--data-dir", type=Path, default=None, help="오프라인 모드 데이터 폴더 (기본: 임시 폴더)")
+    parser.add_argument("--output", type=Path, default=None, help="JSON 리포트 저장 경로")
+    parser.add_argument("--baseline", type=Path, default=None, help="비교할 이전 JSON 리포트")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="허용할 p95 증가 비율")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="회귀로 볼 최소 p95 증가량 (ms)")
+    args = parser.parse_args()
+
+    # rag 모듈을 import 하기 전에 환경 변수 설정 (경로/모델은 import 시점에 결정됨)
+    if not args.live:
+        os.environ["RAG_FAKE_MODELS"] = "1"
+        os.environ["RAG_DATA_DIR"] = str(args.data_dir or tempfile.mkdtemp(prefix="rag_bench_"))
+        os.environ["RAG_CHUNK_SIZE"] = str(args.chunk_size)
+        os.environ["RAG_CHUNK_OVERLAP"] = str(args.chunk_overlap)
+    if args.retrieval_mode:
+        os.environ["RAG_RETRIEVAL_MODE"] = args.retrieval_mode
+    if args.vector_backend:
+        os.environ["RAG_VECTOR_BACKEND"] = args.vector_backend
+    if args.speculative:
+        os.environ["RAG_SPECULATIVE_RETRIEVAL"] = "1"
+
+    from rag import clients, run_qa_chain
+    from rag.chunking import CHUNK_SIZE, CHUNK_OVERLAP
+
+    if not args.live:
+        print(f"🧪 오프라인 모드: {args.corpus.name} → {os.environ['RAG_DATA_DIR']}")
+        build_fixture_index(args.corpus)
+
+    routing_mode = args.routing_mode or run_qa_chain.ROUTING_MODE
+    golden = load_jsonl(args.golden)
+    run_qa_chain.warm_up(routing_mode)
+    for item in golden[:args.warmup]:
+        run_question(item, routing_mode)
+
+    records = []
+    for i in range(args.repeat):
+        for item in golden:
+            records.append(run_question(item, routing_mode))
+        print(f"[{i + 1}/{args.repeat}] ⏱ 질문 {len(golden)}개 완료")
+
+    report = {
+        "golden": args.golden.stem,
+        "routing_mode": routing_mode,
+        "retrieval_mode": run_qa_chain.RETRIEVAL_MODE,
+        "vector_backend": clients.VECTOR_BACKEND,
+        "speculative": run_qa_chain.SPECULATIVE_RETRIEVAL,
+        "chunking": [CHUNK_SIZE, CHUNK_OVERLAP],
+        "fake_models": not args.live,
+        "questions": len(golden),
+        "repeat": args.repeat,
+        **summarize(records),
+        "records": records
+    }
+    print_report(report)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 리포트 저장 완료 → {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failures = compare(report, json.load(f), args.max_regression, args.min_delta_ms)
+        if failures:
+            print("❌ 기준 대비 회귀:")
+            for failure in failures:
+                print(f"- {failure}")
+            sys.exit(1)
+        print("✅ 기준 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
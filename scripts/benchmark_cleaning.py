@@ -0,0 +1,140 @@
+# 텍스트 정제 마이크로 벤치마크
+# 1.	📚 큰 샘플 코퍼스(기본: benchmarks/corpus_v1.jsonl 텍스트에 날짜/링크/슬라이드 번호를 섞어 --size-mb까지 반복)를 만듭니다.
+#       	--chunks로 실제 추출 결과(chunks.json/jsonl)의 페이지 텍스트를 쓸 수도 있습니다.
+#       	노이즈 토큰 일부는 앞 토큰에 공백 없이 붙여, 지운 자리에서 조각이 다시 붙는 경우도 섞습니다.
+# 2.	⏱ 예전 방식(추출 때 정규식 6번 + 적재 때 clean_text로 다시 6번)과 rag.text_cleaning을 페이지 단위로 비교합니다.
+# 3.	🔍 두 결과가 다른 페이지 수(붙은 토큰 고정 예시 포함)도 함께 출력합니다.
+#
+# 예: python scripts/benchmark_cleaning.py --size-mb 50 --repeat 5
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from rag.text_cleaning import clean_text, iter_clean_pages
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CORPUS_PATH = BASE_DIR / "benchmarks" / "corpus_v1.jsonl"
+
+NOISE = ["2024. 3. 15. 오후 2:31", "23.11.2.", "https://gsw.kia.com/manual/view?id=123", "www.kia.com/kr",
+         "gsw.kia.com/ev6", "3/12", "17/240", "\u0001", "  \n  "]
+
+# 노이즈끼리/본문과 공백 없이 붙은 예시 (한 패턴이 지운 뒤 앞뒤가 붙어 다음 패턴에 걸리는 경우)
+ADJACENT_CASES = [
+    "3/122024. 3. 15. 오후 2:311/2\n",
+    "www.kia.com/kr볼트2024. 3. 15. 오후 2:31\nM8www.kia.com/kr ",
+    "12/2024.  3. 15. 2:31 볼트",
+    "gsw.kia.com/ev62024. 3. 15.3/12",
+    "https://a.kia.com/x17/240\u000123.11.2.",
+]
+
+
+# ✅ 예전 방식 (비교 기준): extract_from_pdf와 store_to_vectordb.clean_text에 있던 정제를 그대로 옮김
+def legacy_extract_clean(raw_text: str) -> str:
+    raw_text = raw_text.replace('\u0001', ' ')
+    raw_text = re.sub(
+        r'\d{2,4}\.\s?\d{1,2}\.\s?\d{1,2}\.(\s?(오전|오후)\s?\d{1,2}:\d{2})?', '', raw_text)
+    raw_text = re.sub(r'(https?://\S+|www\.\S+)', '', raw_text)
+    raw_text = re.sub(r'\b[\w.-]+\.kia\.com\S*', '', raw_text)
+    raw_text = re.sub(r'\b\d+/\d+\b', '', raw_text)
+    return re.sub(r'\s{2,}', ' ', raw_text).strip()
+
+
+def legacy_ingest_clean(text: str) -> str:
+    text = text.replace('\u0001', ' ')
+    text = re.sub(
+        r'\d{2,4}\.\s?\d{1,2}\.\s?\d{1,2}\.(\s?(오전|오후)?\s?\d{1,2}:\d{2})?', '', text)
+    text = re.sub(r'(https?://\S+|www\.\S+)', '', text)
+    text = re.sub(r'\b[\w.-]+\.kia\.com\S*', '', text)
+    text = re.sub(r'\b\d+/\d+\b', '', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    return text.strip()
+
+
+def legacy_clean(text: str) -> str:
+    return legacy_ingest_clean(legacy_extract_clean(text))
+
+
+# ✅ 샘플 코퍼스 (페이지 텍스트 목록)
+def load_pages(chunks_path: Path) -> List[str]:
+    with open(chunks_path, "r", encoding="utf-8") as f:
+        chunks = [json.loads(line) for line in f if line.strip()] if chunks_path.suffix == ".jsonl" else json.load(f)
+    return [page.get("text", "") for chunk in chunks for page in (chunk.get("pages") or [chunk])]
+
+
+def synthesize_pages(size_mb: float, page_chars: int = 2000, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        words = " ".join(json.loads(line)["text"] for line in f if line.strip()).split()
+    pages = []
+    total = 0
+    while total < size_mb * 1024 * 1024:
+        parts = []
+        length = 0
+        while length < page_chars:
+            part = rng.choice(NOISE) if rng.random() < 0.05 else rng.choice(words)
+            if parts and rng.random() < 0.02:
+                parts[-1] += part  # 공백 없이 붙임
+            else:
+                parts.append(part)
+            length += len(part) + 1
+        page = " ".join(parts)
+        pages.append(page)
+        total += len(page.encode("utf-8"))
+    return pages
+
+
+def time_pages(clean: Callable[[str], str], pages: List[str], repeat: int) -> Dict:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            clean(page)
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "us_per_page": best / len(pages) * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="텍스트 정제 처리량 비교 (예전 정규식 정제 vs rag.text_cleaning)")
+    parser.add_argument("--chunks", type=Path, default=None, help="추출 결과 chunks.json / chunks.jsonl (기본: 합성 코퍼스)")
+    parser.add_argument("--size-mb", type=float, default=20.0, help="합성 코퍼스 크기 (MB)")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (가장 빠른 값 사용)")
+    args = parser.parse_args()
+
+    pages = load_pages(args.chunks) if args.chunks else synthesize_pages(args.size_mb)
+    size_mb = sum(len(page.encode("utf-8")) for page in pages) / 1024 / 1024
+    print(f"📚 샘플: 페이지 {len(pages)}개, {size_mb:.1f}MB ({args.chunks or '합성 코퍼스'})")
+
+    legacy = time_pages(legacy_clean, pages, args.repeat)
+    shared = time_pages(clean_text, pages, args.repeat)
+    # 스트리밍 API 오버헤드 확인용 (페이지 dict → 정제된 페이지 dict)
+    page_dicts = [{"page": i, "text": page} for i, page in enumerate(pages, 1)]
+    start = time.perf_counter()
+    for _ in iter_clean_pages(page_dicts):
+        pass
+    streaming = time.perf_counter() - start
+
+    mismatches = sum(legacy_clean(page) != clean_text(page) for page in pages)
+    case_mismatches = [case for case in ADJACENT_CASES if legacy_clean(case) != clean_text(case)]
+    print(f"{'방식':<26}{'시간(s)':>10}{'MB/s':>10}{'µs/페이지':>12}")
+    for name, stats in (("예전 (추출 + 적재 2회)", legacy), ("rag.text_cleaning", shared)):
+        print(f"{name:<26}{stats['seconds']:>10.3f}{size_mb / stats['seconds']:>10.1f}{stats['us_per_page']:>12.1f}")
+    print(f"{'iter_clean_pages':<26}{streaming:>10.3f}{size_mb / streaming:>10.1f}"
+          f"{streaming / len(pages) * 1e6:>12.1f}")
+    print(f"⚡ 속도 향상: {legacy['seconds'] / shared['seconds']:.2f}배")
+    print(f"🔍 결과가 다른 페이지: {mismatches}개 / {len(pages)}개")
+    print(f"🔍 붙은 토큰 예시 중 결과가 다른 것: {len(case_mismatches)}개 / {len(ADJACENT_CASES)}개")
+    for case in case_mismatches:
+        print(f"   {case!r}: {legacy_clean(case)!r} != {clean_text(case)!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,25 @@
 # PDF 문서에서 텍스트와 이미지를 추출하여 구조화된 JSON 파일로 저장
 # 1.	📄 PDF 문서를 탐색하여 모든 페이지의 텍스트와 이미지를 추출하고, 경로 정보를 바탕으로 섹션/문서명을 구분합니다.
-# 2.	🧹 텍스트는 날짜·링크·제어문자 등을 제거해 정제하고, 이미지 파일은 페이지별로 PNG 형식으로 저장합니다.
+# 2.	🧹 텍스트는 날짜·링크·제어문자 등을 제거해 정제하고, 이미지는 내용 해시 이름(원래 형식의 확장자)으로 한 번만 저장하고 UI용 WebP 썸네일도 만듭니다.
 # 3.	🗂 정제된 텍스트, 이미지 경로, 원본 경로, 섹션명, 문서명을 포함한 JSON 데이터를 생성해 하나의 파일로 저장합니다.
+# 4.	⚡ --workers 옵션을 주면 PDF 하나당 프로세스 하나로 병렬 추출하고, 끝나는 순서대로 JSON Lines 파일에 바로 씁니다.
 
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import argparse
 import fitz  # PyMuPDF
 import json
-import re
+import time
 import unicodedata
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from typing import List, Dict
 
+from rag.image_store import ImageStore
+from rag.text_cleaning import clean_text, CLEANING_VERSION
+
 
 def extract_from_pdf(pdf_path: str, output_image_dir: str) -> List[Dict]:
     Path(output_image_dir).mkdir(parents=True, exist_ok=True)
@@ -31,52 +37,72 @@ def extract_from_pdf(pdf_path: str, output_image_dir: str) -> List[Dict]:
         section = "기타"
         document = ""
 
-    full_text = ""
+    page_texts = []
     image_paths = []
+    pages = []
+    # 같은 xref(문서 안에서 반복되는 이미지)는 한 번만 추출, 같은 내용은 해시로 한 번만 저장
+    image_store = ImageStore(output_image_dir)
+    xref_images = {}
 
     for page_num in range(len(doc)):
         page = doc.load_page(page_num)
-        raw_text = page.get_text("text")
-
-        # ✅ 제어 문자 제거 및 정리
-        raw_text = raw_text.replace('\u0001', ' ')
-        raw_text = re.sub(
-            r'\d{2,4}\.\s?\d{1,2}\.\s?\d{1,2}\.(\s?(오전|오후)\s?\d{1,2}:\d{2})?', '', raw_text)
-        raw_text = re.sub(r'(https?://\S+|www\.\S+)', '', raw_text)
-        raw_text = re.sub(r'\b[\w.-]+\.kia\.com\S*', '', raw_text)
-        raw_text = re.sub(r'\b\d+/\d+\b', '', raw_text)
-        raw_text = re.sub(r'\s{2,}', ' ', raw_text).strip()
+        # ✅ 제어 문자 제거 및 정리 (적재 때는 다시 정제하지 않음)
+        raw_text = clean_text(page.get_text("text"))
 
         if raw_text:
-            full_text += raw_text + "\n\n"
+            page_texts.append(raw_text)
 
-        # ✅ 이미지 추출
-        for img_index, img in enumerate(page.get_images(full=True)):
+        # ✅ 이미지 추출 (내용 주소 기반 저장소)
+        page_image_paths = []
+        page_image_hashes = []
+        for img in page.get_images(full=True):
             xref = img[0]
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-
-            base_name = Path(pdf_path).stem
-            image_filename = f"{base_name}_page{page_num}_img{img_index}.png"
-            image_path = os.path.join(output_image_dir, image_filename)
-
-            with open(image_path, "wb") as f:
-                f.write(image_bytes)
-
-            image_paths.append(image_path)
-
-    if full_text:
+            if xref not in xref_images:
+                base_image = doc.extract_image(xref)
+                if not base_image:
+                    continue
+                xref_images[xref] = image_store.put(base_image["image"], base_image["ext"])
+            digest, image_path = xref_images[xref]
+
+            if digest in page_image_hashes:
+                continue
+            page_image_hashes.append(digest)
+            page_image_paths.append(image_path)
+            if image_path not in image_paths:
+                image_paths.append(image_path)
+
+        # ✅ 페이지 단위 정보 (청킹 시 페이지 번호/이미지 매핑에 사용, 1부터 시작)
+        if raw_text or page_image_paths:
+            pages.append({
+                "page": page_num + 1,
+                "text": raw_text,
+                "image_paths": page_image_paths,
+                "image_hashes": page_image_hashes
+            })
+
+    doc.close()
+
+    if page_texts:
         return [{
-            "text": full_text.strip(),
+            "text": "\n\n".join(page_texts),
             "image_paths": image_paths,
+            "pages": pages,
             "source": relative_path,
             "section": section,
-            "document": document
+            "document": document,
+            "cleaned": CLEANING_VERSION
         }]
     else:
         return []
 
 
+# ✅ 페이지별 이미지 해시 모음 (중복 제거 통계용)
+def iter_image_hashes(chunks: List[Dict]):
+    for chunk in chunks:
+        for page in chunk.get("pages", []):
+            yield from page.get("image_hashes", [])
+
+
 def get_all_pdf_paths(base_dir: str) -> List[str]:
     pdf_paths = []
     print(f"📂 루트 디렉토리: {base_dir}\n")
@@ -110,12 +136,96 @@ def extract_all_pdfs(pdf_dir: str, image_dir: str, output_json: str):
 
     print(f"\n✅ 전체 추출 완료! 저장 위치 → {output_json}")
     print(f"📦 총 청크 수: {len(all_chunks)}")
+    image_hashes = list(iter_image_hashes(all_chunks))
+    print(f"🖼 페이지 이미지 참조 수: {len(image_hashes)} (고유 이미지 {len(set(image_hashes))}개)")
+
+
+# ✅ 병렬 추출 (PDF 하나당 워커 하나, 끝나는 대로 JSON Lines로 기록)
+# 한 번에 워커 수 x 2개까지만 제출하고, 기록한 결과는 바로 버려 메모리가 코퍼스 크기에 비례하지 않음
+
+
+def extract_all_pdfs_parallel(pdf_dir: str, image_dir: str, output_jsonl: str, workers: int = None):
+    pdf_paths = get_all_pdf_paths(pdf_dir)
+    total = len(pdf_paths)
+    workers = workers or os.cpu_count() or 1
+    print(f"🔍 총 PDF 수: {total} (워커 {workers}개)\n")
+
+    Path(output_jsonl).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{output_jsonl}.tmp"
+    chunk_count = 0
+    image_refs = 0
+    unique_images = set()
+    failed = []
+    started = time.perf_counter()
+
+    with open(tmp_path, "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        pending_paths = iter(pdf_paths)
+        futures = {}
+        done = 0
+
+        def submit_next():
+            for pdf_path in pending_paths:
+                futures[executor.submit(extract_from_pdf, pdf_path, image_dir)] = pdf_path
+                return
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pdf_path = futures.pop(future)
+                submit_next()
+                done += 1
+                try:
+                    chunks = future.result()
+                except Exception as e:
+                    failed.append(pdf_path)
+                    print(f"[{done}/{total}] ❌ 추출 실패: {pdf_path} ({e})")
+                    continue
+
+                for chunk in chunks:
+                    out.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                out.flush()
+                chunk_count += len(chunks)
+                for digest in iter_image_hashes(chunks):
+                    image_refs += 1
+                    unique_images.add(digest)
+                # 기록한 결과는 바로 놓아줌 (Future가 결과를 계속 들고 있지 않도록)
+                del chunks, future
+
+                elapsed = time.perf_counter() - started
+                print(f"[{done}/{total}] 📄 {pdf_path} ({done / elapsed:.1f} PDF/s)")
+            del finished
+
+    os.replace(tmp_path, output_jsonl)
+
+    print(f"\n✅ 전체 추출 완료! 저장 위치 → {output_jsonl}")
+    print(f"📦 총 청크 수: {chunk_count}")
+    print(f"🖼 페이지 이미지 참조 수: {image_refs} (고유 이미지 {len(unique_images)}개)")
+    if failed:
+        print(f"⚠️ 실패한 PDF 수: {len(failed)}")
 
 
 if __name__ == "__main__":
     BASE_DIR = Path(__file__).resolve().parent.parent
-    extract_all_pdfs(
-        pdf_dir=str(BASE_DIR / "data/pdfs"),
-        image_dir=str(BASE_DIR / "data/images"),
-        output_json=str(BASE_DIR / "data/chunks.json")
-    )
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="PDF 정비 지침서 텍스트/이미지 추출")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="병렬 추출 워커 수, 0이면 CPU 수 (지정하면 data/chunks.jsonl 로 스트리밍 저장)")
+    args = parser.parse_args()
+
+    if args.workers is None:
+        extract_all_pdfs(
+            pdf_dir=str(BASE_DIR / "data/pdfs"),
+            image_dir=str(BASE_DIR / "data/images"),
+            output_json=str(BASE_DIR / "data/chunks.json")
+        )
+    else:
+        extract_all_pdfs_parallel(
+            pdf_dir=str(BASE_DIR / "data/pdfs"),
+            image_dir=str(BASE_DIR / "data/images"),
+            output_jsonl=str(BASE_DIR / "data/chunks.jsonl"),
+            workers=args.workers or None
+        )
\ No newline at end of file
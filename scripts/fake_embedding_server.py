@@ -0,0 +1,103 @@
+# 로컬 가짜 임베딩 엔드포인트 (Azure OpenAI / OpenAI 호환)
+# 1.	🧪 POST /openai/deployments/{deployment}/embeddings, /v1/embeddings, /embeddings 요청에
+#       	입력 해시로 만든 결정적(deterministic) 벡터를 돌려줍니다.
+# 2.	⏳ --rate-limit-every N 을 주면 N번째 요청마다 429 + Retry-After 를 돌려줘 백오프/재개 동작을 시험할 수 있습니다.
+#
+# 사용 예:
+#   python scripts/fake_embedding_server.py --port 8765 --rate-limit-every 5
+#   AZURE_OPENAI_API_BASE=http://127.0.0.1:8765 AZURE_OPENAI_API_KEY=fake python scripts/store_to_vectordb.py
+
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import threading
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_vector(value, dim: int):
+    """입력(문자열 또는 토큰 id 목록)에 대해 항상 같은 단위 벡터 생성"""
+    seed = hashlib.sha256(json.dumps(value, ensure_ascii=False).encode("utf-8")).digest()
+    raw = bytearray()
+    for counter in itertools.count():
+        if len(raw) >= dim:
+            break
+        raw.extend(hashlib.sha256(seed + counter.to_bytes(4, "little")).digest())
+    vector = [b / 127.5 - 1.0 for b in raw[:dim]]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeEmbeddingHandler(BaseHTTPRequestHandler):
+    dim = 1536
+    rate_limit_every = 0
+    retry_after = 1
+    _counter = itertools.count(1)
+    _lock = threading.Lock()
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if not self.path.split("?")[0].endswith("/embeddings"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        with self._lock:
+            n = next(self._counter)
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            self._send_json(429, {"error": {"code": "429", "message": "Rate limit (fake)"}},
+                            {"Retry-After": str(self.retry_after)})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        inputs = request.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        data = []
+        for i, value in enumerate(inputs):
+            vector = fake_vector(value, self.dim)
+            if request.get("encoding_format") == "base64":
+                vector = base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+
+        tokens = sum(len(v) if isinstance(v, list) else len(v) // 2 + 1 for v in inputs)
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": request.get("model") or "fake-embedding",
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 가짜 임베딩 엔드포인트")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--rate-limit-every", type=int, default=0,
+                        help="N번째 요청마다 429 응답 (0이면 사용 안 함)")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    FakeEmbeddingHandler.dim = args.dim
+    FakeEmbeddingHandler.rate_limit_every = args.rate_limit_every
+    FakeEmbeddingHandler.retry_after = args.retry_after
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeEmbeddingHandler)
+    print(f"🧪 가짜 임베딩 서버 실행 중 → http://{args.host}:{args.port}")
+    server.serve_forever()
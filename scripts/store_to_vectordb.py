@@ -2,109 +2,310 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import argparse
 import json
-import re
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from collections import defaultdict
 
 from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
-from langchain_openai import AzureOpenAIEmbeddings
 
-load_dotenv()
+from rag.clients import DATA_DIR, CHROMA_DIR, get_embedding_model
+from rag.chunking import chunk_pages, make_chunk_id, CHUNK_SIZE, CHUNK_OVERLAP
+from rag.embedding_writer import EmbeddingWriter
+from rag.manifest import file_hash, load_manifest, save_manifest, record_pdf, MANIFEST_PATH
+from rag.catalog import build_catalog, count_documents, save_catalog, CATALOG_PATH
+from rag.router import compute_and_save_centroids, CENTROIDS_PATH
+from rag.bm25 import compute_and_save_bm25, BM25_PATH
+from rag.image_table import ImageTable, IMAGE_TABLE_PATH
+from rag.vector_bundle import export_bundle, BUNDLE_DIR, BUNDLE_DTYPES
+from rag.text_cleaning import iter_clean_pages, is_cleaned
+from scripts.extract_manuals import extract_from_pdf, get_all_pdf_paths
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-CHUNKS_PATH = BASE_DIR / "data" / "chunks.json"
-CHROMA_DIR = BASE_DIR / "data" / "chroma_db" / "ev6"
+load_dotenv()
 
-embedding_model = AzureOpenAIEmbeddings(
-    azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_API_BASE"),
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
+CHUNKS_PATH = DATA_DIR / "chunks.json"
+CHUNKS_JSONL_PATH = DATA_DIR / "chunks.jsonl"
+PDF_DIR = DATA_DIR / "pdfs"
+IMAGE_DIR = DATA_DIR / "images"
+EMBED_CHECKPOINT_PATH = DATA_DIR / "chroma_db" / "ev6_embed_checkpoint.jsonl"
 
-# ✅ 텍스트 전처리 함수
+# ✅ 임베딩 모델 (디스크 캐시 적용: 같은 청크 텍스트는 다시 임베딩하지 않음)
+embedding_model = get_embedding_model()
 
+# ✅ 페이지 단위로 정제 (pages 정보가 없는 예전 chunks.json은 전체를 한 페이지로 취급)
+# extract_manuals가 이미 정제한 결과(cleaned = CLEANING_VERSION)는 그대로 사용
 
-def clean_text(text: str) -> str:
-    text = text.replace('\u0001', ' ')
-    text = re.sub(
-        r'\d{2,4}\.\s?\d{1,2}\.\s?\d{1,2}\.(\s?(오전|오후)?\s?\d{1,2}:\d{2})?', '', text)
-    text = re.sub(r'(https?://\S+|www\.\S+)', '', text)
-    text = re.sub(r'\b[\w.-]+\.kia\.com\S*', '', text)
-    text = re.sub(r'\b\d+/\d+\b', '', text)  # 슬라이드 번호 제거
-    text = re.sub(r'\s{2,}', ' ', text)
-    return text.strip()
 
-# ✅ 문서 단위 병합 후 LangChain Document 변환
+def get_clean_pages(chunk: Dict) -> List[Dict]:
+    pages = chunk.get("pages") or [{
+        "page": 1,
+        "text": chunk.get("text", ""),
+        "image_paths": chunk.get("image_paths", [])
+    }]
+    if is_cleaned(chunk):
+        return pages
+    return list(iter_clean_pages(pages))
 
+# ✅ PDF별로 청킹 후 LangChain Document 변환
+# 이미지 경로는 메타데이터에 넣지 않고 chunk_images(chunk_id → 경로 목록)에 담아 이미지 테이블에 따로 저장
 
-def convert_to_documents(chunks: List[Dict]) -> List[Document]:
-    doc_map = defaultdict(lambda: {"text": [], "image_paths": [], "meta": {}})
 
+def convert_to_documents(chunks: List[Dict], chunk_size: int = CHUNK_SIZE,
+                         chunk_overlap: int = CHUNK_OVERLAP,
+                         chunk_images: Optional[Dict[str, List[str]]] = None) -> List[Document]:
+    docs = []
     for chunk in chunks:
-        text = clean_text(chunk.get("text", ""))
-        if not text:
-            continue
-
-        key = (chunk.get("section", "").strip().lower(),
-               chunk.get("document", ""))
-        doc_map[key]["text"].append(text)
-        doc_map[key]["image_paths"].extend(chunk.get("image_paths", []))
-        doc_map[key]["meta"] = {
+        meta = {
             "section": chunk.get("section", "").strip().lower(),
             "document": chunk.get("document", ""),
             "source": chunk.get("source", ""),
             "category": chunk.get("category", "")
         }
+        pieces = chunk_pages(get_clean_pages(chunk), chunk_size, chunk_overlap)
 
-    docs = []
-    for (_, _), content in doc_map.items():
-        full_text = "\n\n".join(content["text"])
-        metadata = {
-            **content["meta"],
-            "image_paths": ", ".join(content["image_paths"]),
-            "image_names": ", ".join([os.path.basename(p) for p in content["image_paths"]])
-        }
-        docs.append(Document(page_content=full_text, metadata=metadata))
+        for chunk_index, piece in enumerate(pieces):
+            metadata = {
+                **meta,
+                "chunk_id": make_chunk_id(meta["source"], chunk_index),
+                "page": piece["page"],
+                "page_end": piece["page_end"],
+                "chunk_index": chunk_index
+            }
+            docs.append(Document(page_content=piece["text"], metadata=metadata))
+            if chunk_images is not None and piece["image_paths"]:
+                chunk_images[metadata["chunk_id"]] = list(dict.fromkeys(piece["image_paths"]))
 
     return docs
 
-# ✅ JSON 파일 로드
+# ✅ JSON / JSON Lines 파일 로드
 
 
 def load_chunks(json_path: Path) -> List[Dict]:
     with open(json_path, "r", encoding="utf-8") as f:
+        if Path(json_path).suffix == ".jsonl":
+            return [json.loads(line) for line in f if line.strip()]
         return json.load(f)
 
 # ✅ 벡터 DB 저장
+# 전체 적재는 기존 컬렉션에 upsert하므로, 새 청크 목록에 없는 id(사라진 청크, chunk_id 없는 예전 PDF 통째 문서)는 먼저 삭제
+
+
+def delete_stale_ids(collection, keep_ids: List[str], batch_size: int = 5000) -> int:
+    keep = set(keep_ids)
+    stale_ids = [chunk_id for chunk_id in collection.get(include=[])["ids"] if chunk_id not in keep]
+    for i in range(0, len(stale_ids), batch_size):
+        collection.delete(ids=stale_ids[i:i + batch_size])
+    return len(stale_ids)
 
 
-def store_to_chroma(documents: List[Document], persist_path: Path):
-    vectordb = Chroma.from_documents(
-        documents=documents,
-        embedding=embedding_model,
-        persist_directory=str(persist_path)
+def store_to_chroma(documents: List[Document], persist_path: Path,
+                    checkpoint_path: Path = EMBED_CHECKPOINT_PATH):
+    vectordb = Chroma(
+        persist_directory=str(persist_path),
+        embedding_function=embedding_model
     )
+    deleted = delete_stale_ids(vectordb._collection, [doc.metadata["chunk_id"] for doc in documents])
+    if deleted:
+        print(f"🗑 새 청크 목록에 없는 기존 벡터 삭제: {deleted}개")
+    # 배치/동시성/429 백오프 + 체크포인트 (중단 후 다시 실행하면 남은 배치부터)
+    writer = EmbeddingWriter(embedding_model, vectordb._collection, checkpoint_path)
+    stats = writer.write(documents)
     vectordb.persist()
-    print(f"✅ ChromaDB 저장 완료 → {persist_path}")
+    print(f"✅ ChromaDB 저장 완료 → {persist_path} "
+          f"(임베딩 {stats['written']}개, 체크포인트로 건너뜀 {stats['skipped']}개)")
+    return vectordb
 
+# ✅ 청크 → 이미지 테이블 저장 (전체 적재면 기존 행을 모두 지우고 다시 씀)
 
-if __name__ == "__main__":
-    print("📦 chunks.json 로딩 중...")
-    chunks = load_chunks(CHUNKS_PATH)
+
+def store_images(chunk_images: Dict[str, List[str]], table_path: Path = IMAGE_TABLE_PATH,
+                 replace: bool = True):
+    table = ImageTable(table_path)
+    if replace:
+        table.clear()
+    table.put(chunk_images)
+    print(f"✅ 이미지 테이블 저장 완료 → {table_path} ({table.stats()})")
+    table.close()
+
+# ✅ 전체 적재 후 매니페스트 기록 (다음 실행부터 증분 적재 가능)
+
+
+def store_manifest(documents: List[Document], manifest_path: Path = MANIFEST_PATH):
+    manifest = {"pdfs": {}, "chunking": [CHUNK_SIZE, CHUNK_OVERLAP]}
+    ids_by_source = {}
+    for doc in documents:
+        ids_by_source.setdefault(doc.metadata["source"], []).append(doc.metadata["chunk_id"])
+    for source, ids in ids_by_source.items():
+        # 원본 PDF가 없으면 해시 없이 기록 → 다음 증분 실행 때 한 번 다시 처리
+        content_hash = file_hash(source) if os.path.exists(source) else None
+        record_pdf(manifest, source, content_hash, ids)
+    save_manifest(manifest, manifest_path)
+    print(f"✅ 매니페스트 저장 완료 → {manifest_path} (PDF 수: {len(ids_by_source)})")
+
+# ✅ 증분 적재: 새로 생기거나 바뀐 PDF만 추출/임베딩하고, 사라진 PDF의 벡터는 삭제
+
+
+def store_incremental(pdf_dir: Path, image_dir: Path, persist_path: Path,
+                      manifest_path: Path = MANIFEST_PATH) -> Chroma:
+    vectordb = Chroma(
+        persist_directory=str(persist_path),
+        embedding_function=embedding_model
+    )
+    writer = EmbeddingWriter(embedding_model, vectordb._collection)
+    image_table = ImageTable(IMAGE_TABLE_PATH)
+    manifest = load_manifest(manifest_path)
+    chunking = [CHUNK_SIZE, CHUNK_OVERLAP]
+    if manifest["pdfs"] and manifest.get("chunking") != chunking:
+        # 청킹 설정이 바뀌면 모든 PDF를 다시 처리
+        print(f"⚠️ 청킹 설정 변경 ({manifest.get('chunking')} → {chunking}), 전체 PDF 재처리")
+        for entry in manifest["pdfs"].values():
+            entry["hash"] = None
+    manifest["chunking"] = chunking
+
+    current = {os.path.relpath(path): path for path in get_all_pdf_paths(str(pdf_dir))}
+    removed = [source for source in manifest["pdfs"] if source not in current]
+    changed = []
+    for source, path in current.items():
+        content_hash = file_hash(path)
+        entry = manifest["pdfs"].get(source)
+        if entry is None or entry["hash"] != content_hash:
+            changed.append((source, path, content_hash))
+
+    print(f"🔍 변경 PDF: {len(changed)}개, 삭제 PDF: {len(removed)}개, "
+          f"변경 없음: {len(current) - len(changed)}개")
+
+    for source in removed:
+        old_ids = manifest["pdfs"].pop(source)["ids"]
+        if old_ids:
+            vectordb.delete(ids=old_ids)
+            image_table.delete(old_ids)
+        save_manifest(manifest, manifest_path)
+        print(f"🗑 삭제: {source} (청크 {len(old_ids)}개)")
+
+    for i, (source, path, content_hash) in enumerate(changed, 1):
+        chunk_images = {}
+        documents = convert_to_documents(extract_from_pdf(path, str(image_dir)), chunk_images=chunk_images)
+        ids = [doc.metadata["chunk_id"] for doc in documents]
+        if documents:
+            writer.write(documents)  # 같은 id는 upsert
+        # 이미지가 없어진 청크의 예전 행도 지워지도록 이번 PDF의 청크 전체를 교체
+        image_table.put({chunk_id: chunk_images.get(chunk_id, []) for chunk_id in ids})
+
+        old_ids = manifest["pdfs"].get(source, {}).get("ids", [])
+        stale_ids = sorted(set(old_ids) - set(ids))
+        if stale_ids:
+            vectordb.delete(ids=stale_ids)
+            image_table.delete(stale_ids)
+
+        record_pdf(manifest, source, content_hash, ids)
+        save_manifest(manifest, manifest_path)
+        print(f"[{i}/{len(changed)}] 💾 {source} (청크 {len(ids)}개, 삭제 {len(stale_ids)}개)")
+
+    save_manifest(manifest, manifest_path)
+    image_table.close()
+    return vectordb
+
+# ✅ 섹션 → 문서 카탈로그 저장
+
+
+def store_catalog(vectordb: Chroma, catalog_path: Path = CATALOG_PATH):
+    metadatas = vectordb.get(include=["metadatas"])["metadatas"]
+    catalog = build_catalog(metadatas)
+    save_catalog(catalog, len(metadatas), catalog_path, count_documents(metadatas))
+    print(f"✅ 섹션 카탈로그 저장 완료 → {catalog_path} (섹션 수: {len(catalog)})")
+
+# ✅ 로컬 라우터용 섹션/문서 중심 벡터 저장
+
+
+def store_centroids(vectordb: Chroma, centroids_path: Path = CENTROIDS_PATH):
+    centroids = compute_and_save_centroids(vectordb, centroids_path)
+    print(f"✅ 라우팅 중심 벡터 저장 완료 → {centroids_path} "
+          f"(섹션 {len(centroids['section_names'])}개, 문서 {len(centroids['doc_names'])}개)")
+
+# ✅ 하이브리드 검색용 BM25 역색인 저장
+
+
+def store_bm25(vectordb: Chroma, bm25_path: Path = BM25_PATH):
+    index = compute_and_save_bm25(vectordb, bm25_path)
+    print(f"✅ BM25 역색인 저장 완료 → {bm25_path} "
+          f"(청크 {len(index['ids'])}개, 토큰 종류 {len(index['vocab'])}개)")
+
+# ✅ 읽기 전용 질의 노드용 벡터 번들 내보내기 (양자화 벡터 + Arrow 메타데이터, RAG_VECTOR_BACKEND=bundle)
+
+
+def store_bundle(vectordb: Chroma, bundle_path: Path = BUNDLE_DIR, dtype: str = "int8"):
+    info = export_bundle(vectordb, bundle_path, dtype)
+    print(f"✅ 벡터 번들 저장 완료 → {bundle_path} "
+          f"(청크 {info['count']}개, {info['dtype']} x {info['dim']}, {info['bytes'] / 1024 / 1024:.1f}MB)")
+
+
+# ✅ 전체 적재: chunks.json(l) 전체를 청킹/임베딩
+
+
+def latest_chunks_path() -> Path:
+    """chunks.json(순차 추출)과 chunks.jsonl(병렬 추출) 중 더 최근에 쓰인 파일"""
+    existing = [path for path in (CHUNKS_PATH, CHUNKS_JSONL_PATH) if path.exists()]
+    return max(existing, key=lambda path: path.stat().st_mtime) if existing else CHUNKS_PATH
+
+
+def store_full(chunks_path: Optional[Path] = None) -> Chroma:
+    chunks_path = chunks_path or latest_chunks_path()
+    print(f"📦 {chunks_path.name} 로딩 중...")
+    chunks = load_chunks(chunks_path)
     print(f"🔹 총 청크 수: {len(chunks)}")
 
-    print("🧠 문서 단위로 임베딩 준비 중...")
-    documents = convert_to_documents(chunks)
-    print(f"✅ 변환된 문서 수: {len(documents)}")
+    print(f"🧠 청킹 중... (chunk_size={CHUNK_SIZE}, chunk_overlap={CHUNK_OVERLAP} 토큰)")
+    chunk_images = {}
+    documents = convert_to_documents(chunks, chunk_images=chunk_images)
+    print(f"✅ 변환된 청크 수: {len(documents)}")
 
     if documents:
         print(f"🔍 예시 문서 내용: {documents[0].page_content[:100]}...")
         print(f"🔍 예시 메타데이터: {documents[0].metadata}")
 
     print("💾 ChromaDB 저장 중...")
-    store_to_chroma(documents, CHROMA_DIR)
+    vectordb = store_to_chroma(documents, CHROMA_DIR)
+    store_images(chunk_images)
+    store_manifest(documents)
+    return vectordb
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="청크를 임베딩해 ChromaDB에 저장")
+    parser.add_argument("--incremental", action="store_true",
+                        help="data/pdfs를 매니페스트와 비교해 바뀐 PDF만 추출/임베딩")
+    parser.add_argument("--chunks", type=Path, default=None,
+                        help="적재할 추출 결과 파일 (기본: chunks.json / chunks.jsonl 중 최근 파일)")
+    parser.add_argument("--bundle-dtype", choices=BUNDLE_DTYPES, default="int8",
+                        help="벡터 번들의 벡터 형식 (int8: 1바이트/차원, float16: 2바이트/차원)")
+    parser.add_argument("--bundle-only", action="store_true",
+                        help="적재 없이 기존 ChromaDB에서 벡터 번들만 다시 내보냄")
+    args = parser.parse_args()
+
+    if args.bundle_only:
+        print("📦 벡터 번들 내보내는 중...")
+        store_bundle(Chroma(persist_directory=str(CHROMA_DIR), embedding_function=embedding_model),
+                     dtype=args.bundle_dtype)
+        sys.exit(0)
+
+    if args.incremental:
+        print("🔁 증분 적재 시작...")
+        vectordb = store_incremental(PDF_DIR, IMAGE_DIR, CHROMA_DIR)
+    else:
+        vectordb = store_full(args.chunks)
+
+    print("🗂 섹션 카탈로그 생성 중...")
+    store_catalog(vectordb)
+
+    print("📐 라우팅 중심 벡터 계산 중...")
+    store_centroids(vectordb)
+
+    print("🔤 BM25 역색인 생성 중...")
+    store_bm25(vectordb)
+
+    print("📦 벡터 번들 내보내는 중...")
+    store_bundle(vectordb, dtype=args.bundle_dtype)
+
+    print(f"📊 임베딩 캐시: {embedding_model.stats()}")
@@ -1,28 +1,10 @@
-from langchain_community.vectorstores import Chroma
-from langchain_openai import AzureOpenAIEmbeddings
-from pathlib import Path
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# 경로 설정
-BASE_DIR = Path(__file__).resolve().parent
-CHROMA_DIR = BASE_DIR / "data" / "chroma_db" / "ev6"
+from rag.clients import get_embedding_model, get_vectordb
 
 # Azure 임베딩 (필요 없지만 Chroma 로딩을 위해 필요)
-embedding_model = AzureOpenAIEmbeddings(
-    azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_API_BASE"),
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
+embedding_model = get_embedding_model()
 
 # Chroma 로드
-vectordb = Chroma(
-    persist_directory=str(CHROMA_DIR),
-    embedding_function=embedding_model
-)
+vectordb = get_vectordb()
 
 # 메타데이터에서 섹션만 추출
 collection = vectordb._collection.get(include=["metadatas"])
@@ -44,3 +26,5 @@ if docs:
         print(f"{key}: {value}")
 else:
     print("❌ 관련 문서를 찾을 수 없습니다.")
+
+print(f"\n📊 임베딩 캐시: {embedding_model.stats()}")
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from rag.chunking import _split_blocks, chunk_pages, is_heading
+
+PROCEDURE = "\n".join([
+    "1. 개요",
+    "프론트 브레이크 패드 교환 절차를 설명한다.",
+    "2. 탈거",
+    "1. 휠 너트를 풀고 휠을 탈거한다.",
+    "2. 캘리퍼 가이드 로드 볼트를 푼다.",
+    "3. 캘리퍼 어셈블리를 들어 올리십시오",
+    "4. 패드 리테이너를 점검합니다",
+    "3. 장착",
+    "1. 탈거의 역순으로 장착한다.",
+])
+
+
+@pytest.mark.parametrize("line", [
+    "1. 개요", "2. 탈거", "3.2 구성부품 및 부품 위치", "4. 브레이크 사양", "개요", "■ 주의 사항",
+])
+def test_numbered_heading(line):
+    assert is_heading(line)
+
+
+@pytest.mark.parametrize("line", [
+    "1. 볼트를 푼다.", "1. 볼트를 푼다", "2. 캘리퍼를 탈거한다", "3. 패드를 점검합니다",
+    "4. 커넥터를 분리하세요", "5. 볼트를 규정 토크로 조이십시오", "6. 리프트로 차량을 들어 올린다.",
+])
+def test_procedure_step_is_not_heading(line):
+    assert not is_heading(line)
+
+
+def test_blocks_split_at_headings_not_steps():
+    blocks = _split_blocks(PROCEDURE)
+    assert [block["text"].split("\n")[0] for block in blocks] == ["1. 개요", "2. 탈거", "3. 장착"]
+    assert all(block["heading"] for block in blocks)
+
+
+def test_steps_stay_in_one_chunk():
+    chunks = chunk_pages([{"page": 1, "text": PROCEDURE}], chunk_size=200, chunk_overlap=0)
+    steps = next(chunk["text"] for chunk in chunks if "2. 캘리퍼 가이드" in chunk["text"])
+    assert all(step in steps for step in ("1. 휠 너트", "2. 캘리퍼 가이드", "3. 캘리퍼 어셈블리", "4. 패드"))
+
+
+def test_chunks_keep_all_text():
+    chunks = chunk_pages([{"page": 1, "text": PROCEDURE}], chunk_size=60, chunk_overlap=0)
+    assert "\n".join(chunk["text"] for chunk in chunks) == PROCEDURE
+
+
+def test_image_only_page_attaches_to_previous_chunk():
+    pages = [
+        {"page": 1, "text": "1. 개요\n본문이다.", "image_paths": ["a.png"]},
+        {"page": 2, "text": "", "image_paths": ["b.png"]},
+        {"page": 3, "text": "2. 탈거\n볼트를 푼다.", "image_paths": []},
+    ]
+    chunks = chunk_pages(pages, chunk_size=10, chunk_overlap=0)
+    assert chunks[0]["image_paths"] == ["a.png", "b.png"]
+    assert chunks[-1]["image_paths"] == []
+
+
+def test_leading_image_only_page_attaches_to_first_chunk():
+    pages = [
+        {"page": 1, "text": "", "image_paths": ["cover.png"]},
+        {"page": 2, "text": "1. 개요\n본문이다.", "image_paths": []},
+    ]
+    chunks = chunk_pages(pages)
+    assert chunks[0]["image_paths"] == ["cover.png"]